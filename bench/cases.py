@@ -0,0 +1,170 @@
+# Сценарии бенчмарка: каждая лабораторная на фиксированных синтетических данных.
+# Модули лабораторных импортируются из их каталогов, GUI не создается.
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for lab in ("lab1", "lab2", "lab3", "lab4", "lab5"):
+    path = os.path.join(ROOT, lab)
+    if path not in sys.path:
+        sys.path.append(path)
+
+# размеры изображений для лаб. 1-2 и базовые разрешения рендеров
+IMAGE_SIZES = [(480, 320), (960, 640), (1920, 1280)]
+LAB3_RES = [100, 200, 400]
+LAB4_RES = [100, 200, 400]
+LAB5_RES = [25, 50, 100]
+
+
+def synthetic_image(w, h, seed=0):
+    # плавный градиент с шумом, чтобы фильтры и гистограммы работали не на константе
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w]
+    base = np.stack([x * 255 / max(w - 1, 1), y * 255 / max(h - 1, 1),
+                     (x + y) * 255 / max(w + h - 2, 1)], axis=-1)
+    noise = rng.normal(0, 20, size=(h, w, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def lab1_analyze(size):
+    from analysis import channel_means
+    w, h = size
+    a, b = synthetic_image(w, h, 0), synthetic_image(w, h, 1)
+    return (lambda: (channel_means(a), channel_means(b))), 2 * w * h
+
+
+def lab2_filters(size):
+    from PIL import Image
+    from filters import apply_filter_chain
+    w, h = size
+    img = Image.fromarray(synthetic_image(w, h))
+    return (lambda: apply_filter_chain(img, 1.3, 0.8, 2.0, True, True)), w * h
+
+
+def lab2_pipeline(size):
+    from PIL import Image
+    from filters import FilterPipeline
+    w, h = size
+    img = Image.fromarray(synthetic_image(w, h))
+
+    def run():
+        # полный расчет, затем переключение инверсии и серого (размытие из кеша)
+        p = FilterPipeline(img)
+        p.run(1.3, 0.8, 2.0, False, False)
+        p.run(1.3, 0.8, 2.0, False, True)
+        return p.run(1.3, 0.8, 2.0, True, True)
+    return run, w * h
+
+
+def lab2_histograms(size):
+    from common.histogram import rgb_histograms
+    w, h = size
+    arr = synthetic_image(w, h)
+    # в GUI гистограммы строятся для исходного и обработанного изображений
+    return (lambda: (rgb_histograms(arr), rgb_histograms(arr))), 2 * w * h
+
+
+def lab2_fullres(size, blur=90, strip_rows=64):
+    # сохранение в полном разрешении полосами; размытие с перекрытием больше
+    # полосы (совпадение с обработкой целиком проверяет lab2/test_filters.py)
+    import tempfile
+    from PIL import Image
+    from filters import process_full_resolution
+    w, h = size
+    # каталог удаляется вместе с замыканием run, когда сценарий отработал
+    tmp = tempfile.TemporaryDirectory()
+    Image.fromarray(synthetic_image(w, h)).save(os.path.join(tmp.name, "fullres.png"))
+    run = lambda: process_full_resolution(os.path.join(tmp.name, "fullres.png"), 1.3, 0.8, blur, False, True,
+                                          strip_rows=strip_rows)
+    return run, w * h
+
+
+def lab3_illuminance(res):
+    from illum import resolut, compute, circle_stats
+    W, H, xL, yL, zL, I0, rc = 500, 300, 0, 0, 800, 100, 80
+    Wres, Hres = resolut(W, H, res)
+
+    def run():
+        compute(W, H, xL, yL, zL, I0, Wres, Hres)
+        return circle_stats(W, H, xL, yL, zL, I0, Wres, Hres, rc)
+    return run, Wres * Hres
+
+
+def lab4_sphere(res):
+    from shading import make_scene, render_brightness, compute_resolution
+    lights = [{'pos': np.array([200.0, 200.0, 800.0]), 'I0': 1000.0}]
+    scene = make_scene(0, 0, 500, 100, 1000, lights, 0.7, 0.5, 20)
+    Wres, Hres = compute_resolution(500, 500, res)
+    return (lambda: render_brightness(scene, 500, 500, res)), Wres * Hres
+
+
+def lab5_views(res, deferred=False, zbuffer=False, aa=1):
+    from raytrace import Scene, render_views, view_grid
+    scene = Scene.load(os.path.join(ROOT, "lab5", "scene.json"))
+    pixels = 0
+    for v in range(3):
+        x, y = view_grid(scene, v, res)
+        pixels += len(x) * len(y)
+    return (lambda: render_views(scene, resolution=res, deferred=deferred, zbuffer=zbuffer, aa=aa)), pixels
+
+
+def lab5_deferred(res):
+    return lab5_views(res, deferred=True)
+
+
+def lab5_zbuffer(res):
+    return lab5_views(res, zbuffer=True)
+
+
+def lab5_antialias(res):
+    return lab5_views(res, deferred=True, zbuffer=True, aa=2)
+
+
+def lab5_spheres(res, count=10000):
+    # сцена из count случайных сфер: видимость и тени через BVH
+    from raytrace import Scene, render_views, view_grid
+    rng = np.random.default_rng(0)
+    spheres = [{"C": C, "R": R, "col": col} for C, R, col in
+               zip(rng.uniform(-500, 500, (count, 3)), rng.uniform(5, 20, count), rng.uniform(0, 1, (count, 3)))]
+    lights = [{"pos": np.array([300.0, 0.0, 800.0]), "I0": 1000.0, "col": np.ones(3)}]
+    scene = Scene(spheres, lights)
+    scene.accel()
+    pixels = 0
+    for v in range(3):
+        x, y = view_grid(scene, v, res)
+        pixels += len(x) * len(y)
+    return (lambda: render_views(scene, resolution=res, deferred=True)), pixels
+
+
+def lab5_camera(res):
+    # кадр перспективной камеры высотой res, формат 4:3
+    from raytrace import Scene
+    from camera import Camera, render_camera
+    scene = Scene.load(os.path.join(ROOT, "lab5", "scene.json"))
+    camera = Camera([0.0, 300.0, 1500.0], [0.0, 0.0, 500.0], fov=45)
+    width = res * 4 // 3
+    return (lambda: render_camera(scene, camera, width, res)), width * res
+
+
+# имя -> (фабрика, список размеров); фабрика возвращает (функция, число пикселей)
+CASES = {
+    "lab1.analyze": (lab1_analyze, IMAGE_SIZES),
+    "lab2.filters": (lab2_filters, IMAGE_SIZES),
+    "lab2.pipeline": (lab2_pipeline, IMAGE_SIZES),
+    "lab2.histograms": (lab2_histograms, IMAGE_SIZES),
+    "lab2.fullres": (lab2_fullres, IMAGE_SIZES),
+    "lab3.illuminance": (lab3_illuminance, LAB3_RES),
+    "lab4.sphere": (lab4_sphere, LAB4_RES),
+    "lab5.views": (lab5_views, LAB5_RES),
+    "lab5.deferred": (lab5_deferred, LAB5_RES),
+    "lab5.zbuffer": (lab5_zbuffer, LAB5_RES),
+    "lab5.antialias": (lab5_antialias, LAB5_RES),
+    "lab5.spheres": (lab5_spheres, LAB5_RES),
+    "lab5.camera": (lab5_camera, LAB5_RES),
+}
+
+
+def size_label(size):
+    return f"{size[0]}x{size[1]}" if isinstance(size, tuple) else str(size)
@@ -0,0 +1,89 @@
+# python -m bench [--cases lab4 lab5] [--save bench/baseline.json] [--compare bench/baseline.json]
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from bench.cases import CASES, size_label
+
+
+def measure(fn, repeat=3):
+    # время - лучшее из repeat запусков без tracemalloc, память - отдельный запуск;
+    # tracemalloc видит буферы numpy, но не внутренние буферы PIL
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def run(selected=None, repeat=3, log=print):
+    results = {}
+    for name, (factory, sizes) in CASES.items():
+        if selected and not any(name.startswith(s) for s in selected):
+            continue
+        for size in sizes:
+            fn, pixels = factory(size)
+            wall, peak = measure(fn, repeat)
+            key = f"{name}@{size_label(size)}"
+            results[key] = {"time_s": wall, "peak_mb": peak / 2**20,
+                            "pixels": pixels, "pixels_per_s": pixels / wall if wall > 0 else float("inf")}
+            log(f"{key:32s} {wall * 1e3:10.2f} ms {peak / 2**20:9.2f} MB {pixels / wall / 1e6:9.2f} Мпикс/с")
+    return results
+
+
+def compare(results, baseline, threshold=0.2):
+    # регрессия - время выросло больше чем на threshold относительно базы
+    regressions = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        ratio = r["time_s"] / base["time_s"]
+        if ratio > 1 + threshold:
+            regressions.append((key, base["time_s"], r["time_s"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Бенчмарк рендеров и обработки изображений")
+    parser.add_argument("--cases", nargs="*", help="префиксы сценариев, например lab4 lab5.views")
+    parser.add_argument("--repeat", type=int, default=3, help="число замеров времени")
+    parser.add_argument("--save", help="записать результаты как базу в JSON")
+    parser.add_argument("--compare", help="сравнить с базой из JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое замедление (доля)")
+    args = parser.parse_args(argv)
+
+    results = run(args.cases, args.repeat)
+
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for key, old, new, ratio in regressions:
+            print(f"РЕГРЕССИЯ {key}: {old * 1e3:.2f} -> {new * 1e3:.2f} ms (x{ratio:.2f})")
+        if regressions:
+            status = 1
+        else:
+            print("Регрессий нет")
+
+    if args.save:
+        meta = {"python": sys.version.split()[0], "numpy": np.__version__,
+                "platform": platform.platform(), "machine": platform.machine()}
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+
+    sys.exit(status)
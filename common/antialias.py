@@ -0,0 +1,39 @@
+# Адаптивное сглаживание: пиксели на границах (между соседями меняется
+# маска, номер сферы или набор источников, не попавших в тень) считаются
+# заново по n x n стратифицированным выборкам внутри пикселя, остальные
+# остаются с одной выборкой в центре. Качество на краях - как у n*n SSAA,
+# а дополнительная работа - только на доле пикселей у границ.
+import numpy as np
+
+
+def stratified_offsets(n=2, jitter=True, seed=0):
+    # смещения выборок в долях пикселя, (n * n, 2) в [-0.5, 0.5): по одной
+    # в каждой клетке решетки n x n, со случайным сдвигом внутри клетки
+    # (jitter) или в ее центре. Схема одна для всех пикселей и фиксирована
+    # seed, поэтому кадр не зависит от разбиения на полосы и процессы
+    i, j = np.meshgrid(np.arange(n), np.arange(n), indexing="ij")
+    u = np.random.default_rng(seed).random((n, n, 2)) if jitter else np.full((n, n, 2), 0.5)
+    return np.stack([(j + u[..., 0]) / n - 0.5, (i + u[..., 1]) / n - 0.5], axis=-1).reshape(-1, 2)
+
+
+def edge_mask(*labels):
+    # пиксели, у которых хотя бы одна карта меток отличается от соседа по
+    # горизонтали или вертикали; отмечаются обе стороны границы
+    mask = np.zeros(labels[0].shape, dtype=bool)
+    for lab in labels:
+        dx = lab[:, 1:] != lab[:, :-1]
+        dy = lab[1:] != lab[:-1]
+        mask[:, 1:] |= dx
+        mask[:, :-1] |= dx
+        mask[1:] |= dy
+        mask[:-1] |= dy
+    return mask
+
+
+def supersample(sample, px, py, sx, sy, offsets):
+    # среднее sample(x, y) по выборкам offsets вокруг точек (px, py), sx и sy -
+    # шаг пикселя; все выборки передаются в sample одним массивом
+    xs = (px[:, None] + offsets[:, 0] * sx).reshape(-1)
+    ys = (py[:, None] + offsets[:, 1] * sy).reshape(-1)
+    values = np.asarray(sample(xs, ys))
+    return values.reshape((len(px), len(offsets)) + values.shape[1:]).mean(axis=1)
@@ -0,0 +1,67 @@
+# Потоковая запись анимированного PNG (APNG): кадры сжимаются и пишутся в
+# файл по одному, в памяти держится только текущий кадр. Pillow для
+# анимаций собирает все кадры в список, поэтому формат пишется вручную:
+# сигнатура, IHDR, acTL, затем на кадр fcTL + IDAT (первый) или fdAT.
+import struct
+import zlib
+
+import numpy as np
+
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def _compress(img, level):
+    # строки с фильтром Sub (разность с соседним слева пикселем)
+    rows = img.reshape(img.shape[0], -1)
+    filtered = rows.copy()
+    filtered[:, 3:] -= rows[:, :-3]
+    return zlib.compress(np.hstack([np.ones((len(rows), 1), np.uint8), filtered]).tobytes(), level)
+
+
+class ApngWriter:
+    def __init__(self, path, width, height, frames, fps=25, loops=0, level=6):
+        # frames - ожидаемое число кадров; если записано другое число, при
+        # закрытии оно исправляется в acTL
+        self.width, self.height = width, height
+        self.delay = (1, int(fps))
+        self.level = level
+        self.count = 0
+        self.seq = 0
+        self.f = open(path, "wb")
+        self.f.write(SIGNATURE)
+        self.f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        self.actl_pos = self.f.tell()
+        self.loops = loops
+        self.f.write(_chunk(b"acTL", struct.pack(">II", frames, loops)))
+
+    def add(self, img):
+        # img - uint8 (height, width, 3)
+        img = np.ascontiguousarray(img, dtype=np.uint8)
+        if img.shape != (self.height, self.width, 3):
+            raise ValueError(f"кадр {img.shape}, ожидается {(self.height, self.width, 3)}")
+        self.f.write(_chunk(b"fcTL", struct.pack(">IIIIIHHBB", self.seq, self.width, self.height, 0, 0,
+                                                 *self.delay, 0, 0)))
+        self.seq += 1
+        data = _compress(img, self.level)
+        if self.count == 0:
+            self.f.write(_chunk(b"IDAT", data))
+        else:
+            self.f.write(_chunk(b"fdAT", struct.pack(">I", self.seq) + data))
+            self.seq += 1
+        self.count += 1
+
+    def close(self):
+        self.f.write(_chunk(b"IEND", b""))
+        self.f.seek(self.actl_pos)
+        self.f.write(_chunk(b"acTL", struct.pack(">II", self.count, self.loops)))
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,75 @@
+# Дисковый кеш наборов массивов (.npz). Имя файла - sha256 от параметров,
+# при превышении max_bytes удаляются давно не использованные записи
+# (LRU по времени последнего чтения). На нем же построен FieldCache в lab3/sweep.py.
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+def _plain(value):
+    # массивы и числа NumPy -> обычные списки и числа для json
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"не сериализуется: {type(value).__name__}")
+
+
+class ArrayCache:
+    def __init__(self, path, max_bytes=256 << 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        raw = json.dumps(parts, default=_plain, sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + ".npz")
+
+    def get(self, key):
+        path = self._file(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # запись успел вытеснить другой процесс - данные уже прочитаны
+            pass
+        return arrays
+
+    def put(self, key, arrays):
+        path = self._file(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        # .npy - записи прежнего формата FieldCache, учитываются и вытесняются
+        # наравне с .npz; файл, удаленный другим процессом, пропускается
+        files = []
+        for name in os.listdir(self.path):
+            if name.endswith((".npz", ".npy")):
+                try:
+                    st = os.stat(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+            total -= size
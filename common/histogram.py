@@ -0,0 +1,93 @@
+# Гистограммы RGB без копий каналов и графики, которые обновляются на месте.
+import numpy as np
+
+EDGES = np.arange(257)
+COLORS = ("r", "g", "b")
+
+
+def rgb_histograms(arr, chunk=1 << 18):
+    # (3, 256): bincount по срезам с шагом 3, без копий каналов. Изображение
+    # идет блоками строк по ~chunk пикселей: bincount не расширяет все в int64
+    # сразу, а несмежное представление (например, BMP из loader) копируется
+    # только поблочно
+    arr = np.asarray(arr)
+    arr = arr.reshape(-1, arr.shape[-2], 3) if arr.ndim > 2 else arr.reshape(1, -1, 3)
+    counts = np.zeros((3, 256), dtype=np.int64)
+    step = max(1, chunk // arr.shape[1])
+    for r in range(0, len(arr), step):
+        part = np.ascontiguousarray(arr[r:r + step]).reshape(-1)
+        for c in range(3):
+            counts[c] += np.bincount(part[c::3], minlength=256)
+    return counts
+
+
+class RGBHistogram:
+    # накопительная гистограмма: можно добавлять и вычитать области изображения
+    def __init__(self, arr=None):
+        self.counts = np.zeros((3, 256), dtype=np.int64)
+        if arr is not None:
+            self.add(arr)
+
+    def add(self, arr):
+        self.counts += rgb_histograms(arr)
+        return self
+
+    def remove(self, arr):
+        self.counts -= rgb_histograms(arr)
+        return self
+
+    def replace(self, old, new):
+        # область изменилась: вычитаем старые пиксели, добавляем новые
+        return self.remove(old).add(new)
+
+
+class HistogramPlot:
+    # одна фигура с несколькими гистограммами. Фигура и холст создаются один
+    # раз; при обновлении меняются данные существующих StepPatch и
+    # перерисовываются только они поверх сохраненного фона осей (blit).
+    # Высоты нормируются на максимум, чтобы шкала y не менялась.
+    def __init__(self, master, titles, figsize=(8, 3), dpi=100):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.axes = self.figure.subplots(1, len(titles), squeeze=False)[0]
+        self.patches = []
+        for ax, title in zip(self.axes, titles):
+            ax.set_title(title)
+            ax.set_xlim(0, 255)
+            ax.set_ylim(0, 1.05)
+            ax.set_yticks([])
+            self.patches.append([ax.stairs(np.zeros(256), EDGES, fill=True, color=col,
+                                           alpha=0.5, animated=True)
+                                 for col in COLORS])
+        self.figure.tight_layout()
+        self.backgrounds = None
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.get_tk_widget().pack()
+        self.canvas.draw()
+
+    def _on_draw(self, event):
+        # после полной перерисовки (в т.ч. изменения размера) запоминаем фон
+        self.backgrounds = [self.canvas.copy_from_bbox(ax.bbox) for ax in self.axes]
+        for k in range(len(self.axes)):
+            self._draw_patches(k)
+
+    def _draw_patches(self, k):
+        for patch in self.patches[k]:
+            self.axes[k].draw_artist(patch)
+
+    def set_counts(self, k, counts):
+        counts = np.asarray(counts, dtype=float)
+        scale = max(1.0, counts.max())
+        for patch, values in zip(self.patches[k], counts):
+            patch.set_data(values / scale)
+        if self.backgrounds is None:
+            return
+        self.canvas.restore_region(self.backgrounds[k])
+        self._draw_patches(k)
+        self.canvas.blit(self.axes[k].bbox)
+
+    def clear(self, k):
+        self.set_counts(k, np.zeros((3, 256)))
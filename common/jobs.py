@@ -0,0 +1,104 @@
+# Фоновые задачи для Tk-интерфейсов: расчет идет в потоке исполнителя,
+# результаты возвращаются в поток Tk через очередь, которую опрашивает after().
+# Новая задача с тем же ключом отменяет предыдущую: ее результат не доставляется,
+# а если она еще не начата - не запускается вовсе.
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    # передается в функцию задачи: флаг отмены и отправка промежуточных результатов
+    def __init__(self, runner, key, gen):
+        self.runner = runner
+        self.key = key
+        self.gen = gen
+        self.cancel_event = threading.Event()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def progress(self, value):
+        self.runner.results.put((self.key, self.gen, "progress", value))
+
+
+class JobRunner:
+    def __init__(self, root, workers=1, poll_ms=50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.results = queue.Queue()
+        self.jobs = {}  # ключ -> (Job, future, обработчики)
+        self.gen = 0
+        self.polling = False
+
+    def run(self, fn, on_done=None, on_progress=None, on_error=None, key="default"):
+        # fn(job) выполняется в фоне; on_done(результат), on_progress(значение)
+        # и on_error(исключение) вызываются в потоке Tk
+        self.cancel(key)
+        self.gen += 1
+        job = Job(self, key, self.gen)
+        future = self.executor.submit(self._call, fn, job)
+        self.jobs[key] = (job, future, (on_done, on_progress, on_error))
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_ms, self._poll)
+        return job
+
+    def _call(self, fn, job):
+        if job.cancelled():
+            return
+        try:
+            result = fn(job)
+        except Exception as e:
+            self.results.put((job.key, job.gen, "error", e))
+        else:
+            self.results.put((job.key, job.gen, "done", result))
+
+    def cancel(self, key="default"):
+        entry = self.jobs.pop(key, None)
+        if entry is not None:
+            job, future, _ = entry
+            job.cancel_event.set()
+            future.cancel()
+
+    def busy(self, key="default"):
+        return key in self.jobs
+
+    def _poll(self):
+        try:
+            self._drain()
+        finally:
+            # исключение из обработчика не должно останавливать опрос
+            if self.jobs:
+                self.root.after(self.poll_ms, self._poll)
+            else:
+                self.polling = False
+
+    def _drain(self):
+        while True:
+            try:
+                key, gen, kind, value = self.results.get_nowait()
+            except queue.Empty:
+                return
+            entry = self.jobs.get(key)
+            if entry is None or entry[0].gen != gen:
+                continue  # устаревшая задача
+            on_done, on_progress, on_error = entry[2]
+            if kind == "progress":
+                if on_progress:
+                    on_progress(value)
+                continue
+            del self.jobs[key]
+            if kind == "done":
+                if on_done:
+                    on_done(value)
+            elif on_error:
+                on_error(value)
+            else:
+                raise value
+
+    def shutdown(self):
+        for key in list(self.jobs):
+            self.cancel(key)
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,102 @@
+# Загрузка изображений в массивы NumPy с минимумом копий.
+# Несжатые форматы (NPY, PPM P6, BMP 24/32 бит) отображаются в память
+# напрямую: возвращается представление (view) файла без декодирования.
+import os
+
+import numpy as np
+from PIL import Image
+
+
+def _map_npy(path):
+    arr = np.load(path, mmap_mode="r")
+    if arr.dtype != np.uint8 or arr.ndim not in (2, 3):
+        return None
+    if arr.ndim == 2:
+        # оттенки серого: три "канала" - одно и то же представление
+        return np.broadcast_to(arr[:, :, None], arr.shape + (3,))
+    if arr.shape[2] in (3, 4):
+        return arr[:, :, :3]
+    return None
+
+
+def _map_ppm(path):
+    # P6 <ширина> <высота> <maxval> и один пробельный символ перед данными
+    with open(path, "rb") as f:
+        head = f.read(512)
+    if not head.startswith(b"P6"):
+        return None
+    tokens, pos = [], 2
+    while len(tokens) < 3:
+        while pos < len(head) and head[pos:pos + 1].isspace():
+            pos += 1
+        if head[pos:pos + 1] == b"#":
+            pos = head.index(b"\n", pos)
+            continue
+        end = pos
+        while end < len(head) and head[end:end + 1].isdigit():
+            end += 1
+        if end == pos:
+            return None
+        tokens.append(int(head[pos:end]))
+        pos = end
+    W, H, maxval = tokens
+    if maxval > 255:
+        return None
+    return np.memmap(path, dtype=np.uint8, mode="r", offset=pos + 1, shape=(H, W, 3))
+
+
+def _map_bmp(path):
+    # несжатый BMP (BI_RGB) 24 или 32 бит: строки снизу вверх, порядок BGR(A),
+    # каждая строка дополнена до кратной 4 байтам длины
+    with open(path, "rb") as f:
+        head = f.read(54)
+    if len(head) < 54 or head[:2] != b"BM":
+        return None
+    offset = int.from_bytes(head[10:14], "little")
+    W = int.from_bytes(head[18:22], "little", signed=True)
+    H = int.from_bytes(head[22:26], "little", signed=True)
+    bpp = int.from_bytes(head[28:30], "little")
+    compression = int.from_bytes(head[30:34], "little")
+    if compression != 0 or bpp not in (24, 32) or W <= 0:
+        return None
+    ch = bpp // 8
+    stride = (W * bpp + 31) // 32 * 4
+    rows = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(abs(H), stride))
+    view = rows[:, :W * ch].reshape(abs(H), W, ch)[:, :, 2::-1]
+    return view[::-1] if H > 0 else view
+
+
+MAPPERS = {".npy": _map_npy, ".ppm": _map_ppm, ".pnm": _map_ppm, ".bmp": _map_bmp}
+
+
+def map_image(path):
+    # (H, W, 3) uint8 только для чтения поверх файла или None, если формат
+    # нельзя отобразить без декодирования
+    mapper = MAPPERS.get(os.path.splitext(path)[1].lower())
+    if mapper is None:
+        return None
+    try:
+        return mapper(path)
+    except (OSError, ValueError):
+        return None
+
+
+def load_rgb(path, size=None):
+    # (массив RGB, исходный размер (W, H)). Без size для отображаемых форматов
+    # возвращается представление файла, иначе изображение декодируется один
+    # раз (без лишнего convert для RGB) и при необходимости уменьшается
+    view = map_image(path)
+    if view is not None:
+        src_size = (view.shape[1], view.shape[0])
+        if size is None or tuple(size) == src_size:
+            return view, src_size
+        # для NPY и PPM массив непрерывный и fromarray не копирует пиксели
+        img = Image.fromarray(np.ascontiguousarray(view))
+    else:
+        img = Image.open(path)
+        src_size = img.size
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        if size is None:
+            return np.asarray(img), src_size
+    return np.asarray(img.resize(tuple(size), Image.Resampling.LANCZOS)), src_size
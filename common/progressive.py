@@ -0,0 +1,27 @@
+# Прогрессивный рендер: кадр считается уровнями на решетках с шагом 8, 4, 2, 1
+# пиксель. Каждый уровень досчитывает только новые узлы своей решетки, уже
+# посчитанные значения переиспользуются, поэтому в сумме каждый пиксель
+# считается один раз. Превью уровня - увеличение по ближайшему узлу.
+import numpy as np
+
+STEPS = (8, 4, 2, 1)
+
+
+def level_masks(Hres, Wres, steps=STEPS):
+    # (шаг, маска новых пикселей уровня); последний шаг должен быть 1
+    done = np.zeros((Hres, Wres), dtype=bool)
+    for step in steps:
+        mask = np.zeros_like(done)
+        mask[::step, ::step] = True
+        mask &= ~done
+        done |= mask
+        yield step, mask
+
+
+def upsample(img, step):
+    # каждый пиксель берет значение ближайшего слева-сверху узла решетки step
+    if step == 1:
+        return img
+    rows = np.arange(img.shape[0]) // step * step
+    cols = np.arange(img.shape[1]) // step * step
+    return img[rows[:, None], cols]
@@ -0,0 +1,43 @@
+import numpy as np
+
+from common.histogram import rgb_histograms
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def channel_means(arr):
+    # среднее значение каждого канала RGB изображения (H, W, 3)
+    return np.mean(arr, axis=(0, 1))
+
+
+def histogram_percentiles(hist, q):
+    # перцентили 8-битного канала по его гистограмме - то же, что
+    # np.percentile (линейная интерполяция) по всем пикселям канала
+    cum = np.cumsum(hist)
+    pos = np.asarray(q, dtype=float) / 100 * (cum[-1] - 1)
+    lo = np.floor(pos)
+    v0 = np.searchsorted(cum, lo, side='right')
+    v1 = np.searchsorted(cum, np.minimum(lo + 1, cum[-1] - 1), side='right')
+    return v0 + (pos - lo) * (v1 - v0)
+
+
+def channel_stats(arr, percentiles=PERCENTILES):
+    # среднее, СКО, перцентили и гистограммы каналов за один проход:
+    # все величины считаются по гистограмме (3, 256), а не по пикселям
+    hist = rgb_histograms(arr)
+    levels = np.arange(256)
+    n = hist.sum(axis=1)
+    mean = hist @ levels / n
+    std = np.sqrt(np.maximum(hist @ levels**2 / n - mean**2, 0))
+    pct = np.array([histogram_percentiles(h, percentiles) for h in hist])
+    return {'mean': mean, 'std': std, 'percentiles': pct, 'hist': hist}
+
+
+def color_features(arr, bins=4):
+    # компактный вектор признаков: средние каналов в [0, 1] и грубая
+    # совместная гистограмма цветов bins^3, нормированная на число пикселей
+    shift = 8 - int(np.log2(bins))
+    q = np.asarray(arr, dtype=np.uint8).reshape(-1, 3) >> shift
+    idx = (q[:, 0].astype(np.intp) * bins + q[:, 1]) * bins + q[:, 2]
+    hist = np.bincount(idx, minlength=bins**3) / len(idx)
+    return np.concatenate([channel_means(arr) / 255, hist]).astype(np.float32)
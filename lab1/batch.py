@@ -0,0 +1,153 @@
+# Статистика каналов RGB для каталога изображений без GUI:
+# python batch.py каталог [-o stats.csv] [-j процессы] [--draft 512] [--hist] [--resume]
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analysis import PERCENTILES, channel_stats
+from common.loader import load_rgb
+
+EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.ppm', '.npy')
+CHANNELS = 'rgb'
+
+
+def iter_images(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(EXTENSIONS):
+                yield os.path.join(dirpath, name)
+
+
+def columns(with_hist=False):
+    cols = ['path', 'width', 'height']
+    for c in CHANNELS:
+        cols += [f'mean_{c}', f'std_{c}'] + [f'p{q}_{c}' for q in PERCENTILES]
+    if with_hist:
+        cols += [f'h{c}{v}' for c in CHANNELS for v in range(256)]
+    return cols
+
+
+def read_rgb(path, draft=None):
+    # (массив, (W, H)); NPY, PPM и BMP отображаются в память без копии
+    if not draft or not path.lower().endswith(('.jpg', '.jpeg')):
+        return load_rgb(path)
+    with Image.open(path) as img:
+        size = img.size
+        # JPEG декодируется сразу в уменьшенном масштабе (1/2..1/8);
+        # остальные форматы draft не уменьшает, они читаются через load_rgb
+        img.draft('RGB', (draft, draft))
+        return np.asarray(img.convert('RGB')), size
+
+
+def image_row(path, draft=None, with_hist=False):
+    arr, (width, height) = read_rgb(path, draft)
+    stats = channel_stats(arr)
+    row = {'path': path, 'width': width, 'height': height}
+    for k, c in enumerate(CHANNELS):
+        row[f'mean_{c}'] = round(float(stats['mean'][k]), 3)
+        row[f'std_{c}'] = round(float(stats['std'][k]), 3)
+        for q, v in zip(PERCENTILES, stats['percentiles'][k]):
+            row[f'p{q}_{c}'] = round(float(v), 3)
+        if with_hist:
+            row.update({f'h{c}{v}': int(n) for v, n in enumerate(stats['hist'][k])})
+    return row
+
+
+def _job(args):
+    path, draft, with_hist = args
+    try:
+        return path, image_row(path, draft, with_hist), None
+    except (OSError, ValueError) as e:
+        return path, None, str(e)
+
+
+def imap_bounded(fn, jobs, workers):
+    # результаты fn(job) в порядке готовности; в работе одновременно не
+    # больше 4 * workers заданий, поэтому список файлов не раскрывается целиком
+    if workers <= 1:
+        yield from map(fn, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = set()
+        for job in jobs:
+            pending.add(ex.submit(fn, job))
+            if len(pending) >= 4 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    yield fut.result()
+        for fut in wait(pending)[0]:
+            yield fut.result()
+
+
+def done_paths(path, fieldnames):
+    # пути, уже записанные в таблицу прошлым (возможно, прерванным) запуском;
+    # недописанная последняя строка отрезается
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames != fieldnames:
+            raise ValueError(f'столбцы {path} не совпадают с текущими параметрами (--hist)')
+        return {row['path'] for row in reader}
+
+
+def run_batch(root, output, workers=None, draft=None, with_hist=False, resume=False, on_error=None):
+    # файлы идут через пул процессов (imap_bounded), строки пишутся в CSV
+    # по мере готовности
+    fieldnames = columns(with_hist)
+    skip = done_paths(output, fieldnames) if resume else None
+    append = skip is not None
+    skip = skip or set()
+    workers = workers or os.cpu_count()
+    written = 0
+    with open(output, 'a' if append else 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        if not append:
+            writer.writeheader()
+
+        jobs = ((p, draft, with_hist) for p in iter_images(root) if p not in skip)
+        for path, row, error in imap_bounded(_job, jobs, workers):
+            if row is None:
+                if on_error:
+                    on_error(path, error)
+                continue
+            writer.writerow(row)
+            written += 1
+            if written % 100 == 0:
+                f.flush()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Статистика каналов RGB для каталога изображений')
+    parser.add_argument('root', help='каталог с изображениями (обходится рекурсивно)')
+    parser.add_argument('-o', '--output', default='rgb_stats.csv', help='CSV-таблица результатов')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='число процессов (1 - без пула)')
+    parser.add_argument('--draft', type=int, default=None,
+                        help='декодировать JPEG в уменьшенном виде (не меньше N пикселей по стороне)')
+    parser.add_argument('--hist', action='store_true', help='добавить в таблицу гистограммы (3 x 256 столбцов)')
+    parser.add_argument('--resume', action='store_true', help='пропустить файлы, уже записанные в таблицу')
+    args = parser.parse_args(argv)
+
+    def report(path, error):
+        print(f'Ошибка {path}: {error}', file=sys.stderr)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    n = run_batch(args.root, args.output, args.workers, args.draft, args.hist, args.resume, report)
+    print(f'Обработано изображений: {n}, таблица: {args.output}')
+
+
+if __name__ == '__main__':
+    main()
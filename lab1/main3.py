@@ -1,114 +1,133 @@
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-
-from PIL import Image, ImageTk
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-class ImageRGBAnalyzer:
-    def __init__(self, parent):
-        self.parent = parent
-        self.frame = ttk.Frame(parent)
-        self._build_ui()
-
-    def _build_ui(self):
-        frm = self.frame
-        ttk.Label(frm, text='480x320').grid(row=0, column=0, columnspan=4, pady=6)
-
-        # кнопки
-        ttk.Button(frm, text='Choose Image A', command=self.load_a).grid(row=1, column=0, padx=4, pady=4)
-        ttk.Button(frm, text='Choose Image B', command=self.load_b).grid(row=1, column=1, padx=4, pady=4)
-        ttk.Button(frm, text='Analyze', command=self.analyze).grid(row=1, column=2, padx=4, pady=4)
-
-        self.canvas_a = tk.Canvas(frm, width=480, height=320, bg='gray')
-        self.canvas_b = tk.Canvas(frm, width=480, height=320, bg='gray')
-        self.canvas_a.grid(row=2, column=0, padx=4, pady=4)
-        self.canvas_b.grid(row=2, column=1, padx=4, pady=4)
-
-        self.label_avg_a = ttk.Label(frm, text='RGB A: N/A')
-        self.label_avg_b = ttk.Label(frm, text='RGB B: N/A')
-        self.label_avg_a.grid(row=3, column=0)
-        self.label_avg_b.grid(row=3, column=1)
-
-        self.imgtk_a = None
-        self.imgtk_b = None
-        self.img_a = None
-        self.img_b = None
-        self.arr_a = None
-        self.arr_b = None
-
-        self.hist_frames = [ttk.Frame(frm) for _ in range(6)]
-        for i, f in enumerate(self.hist_frames):
-            f.grid(row=4, column=i%2, padx=4, pady=4)
-
-    def load_a(self):
-        path = filedialog.askopenfilename(title='Select Image A', filetypes=[('Image files', '*.png;*.jpg;*.jpeg;*.bmp;*.tif;*.tiff')])
-        if path:
-            self.img_a = Image.open(path).convert('RGB').resize((480,320), Image.Resampling.LANCZOS)
-            self.imgtk_a = ImageTk.PhotoImage(self.img_a)
-            self.canvas_a.delete('all')
-            self.canvas_a.create_image(240,160, image=self.imgtk_a)
-            self.arr_a = np.array(self.img_a)
-
-    def load_b(self):
-        path = filedialog.askopenfilename(title='Select Image B', filetypes=[('Image files', '*.png;*.jpg;*.jpeg;*.bmp;*.tif;*.tiff')])
-        if path:
-            self.img_b = Image.open(path).convert('RGB').resize((480,320), Image.Resampling.LANCZOS)
-            self.imgtk_b = ImageTk.PhotoImage(self.img_b)
-            self.canvas_b.delete('all')
-            self.canvas_b.create_image(240,160, image=self.imgtk_b)
-            self.arr_b = np.array(self.img_b)
-
-    def analyze(self):
-        if self.arr_a is None or self.arr_b is None:
-            messagebox.showwarning('Missing images', 'Please load both images')
-            return
-
-        # Среднее RGB
-        avg_a = np.mean(self.arr_a, axis=(0, 1))
-        avg_b = np.mean(self.arr_b, axis=(0, 1))
-        self.label_avg_a.config(text=f'RGB A: {avg_a[0]:.1f}, {avg_a[1]:.1f}, {avg_a[2]:.1f}')
-        self.label_avg_b.config(text=f'RGB B: {avg_b[0]:.1f}, {avg_b[1]:.1f}, {avg_b[2]:.1f}')
-
-        # Очистка предыдущих гистограмм
-        for frame in self.hist_frames:
-            for widget in frame.winfo_children():
-                widget.destroy()
-
-        # Отображение гистограмм 3 столбца (R,G,B) для каждой картинки
-        for i, (arr, frame, avg) in enumerate(zip([self.arr_a, self.arr_b],
-                                                  [self.hist_frames[0], self.hist_frames[1]],
-                                                  [avg_a, avg_b])):
-            plt.close('all')
-            fig, ax = plt.subplots(figsize=(3, 2), dpi=100)
-            colors = ['r', 'g', 'b']
-
-            # Создание столбцов
-            for c, col in enumerate(colors):
-                height = np.mean(arr[:, :, c])
-                ax.bar(c, height, color=col, alpha=0.7)
-
-                ax.text(c, height + 5, f'{avg[c]:.1f}',
-                        ha='center', va='bottom', fontsize=8, fontweight='bold')
-
-            ax.set_xticks([0, 1, 2])
-            ax.set_xticklabels(['R', 'G', 'B'])
-            ax.set_ylim(0, max(avg_a.max(), avg_b.max()) + 20)
-            ax.set_title(f'RGB Image {"A" if i == 0 else "B"}')
-
-            canvas = FigureCanvasTkAgg(fig, master=frame)
-            canvas.get_tk_widget().pack()
-            canvas.draw()
-
-class LauncherApp(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title('RGB Analyzer')
-        self.geometry('1100x700')
-        self.image_module = ImageRGBAnalyzer(self)
-        self.image_module.frame.pack(fill='both', expand=True)
-
-if __name__ == '__main__':
-    app = LauncherApp()
-    app.mainloop()
+import os
+import sys
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+from PIL import Image, ImageTk
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analysis import channel_means
+from common.jobs import JobRunner
+from common.loader import load_rgb
+
+class ImageRGBAnalyzer:
+    def __init__(self, parent):
+        self.parent = parent
+        self.frame = ttk.Frame(parent)
+        # загрузка и анализ идут в фоне, окно не замирает
+        self.jobs = JobRunner(parent)
+        self._build_ui()
+
+    def _build_ui(self):
+        frm = self.frame
+        ttk.Label(frm, text='480x320').grid(row=0, column=0, columnspan=4, pady=6)
+
+        # кнопки
+        ttk.Button(frm, text='Choose Image A', command=self.load_a).grid(row=1, column=0, padx=4, pady=4)
+        ttk.Button(frm, text='Choose Image B', command=self.load_b).grid(row=1, column=1, padx=4, pady=4)
+        ttk.Button(frm, text='Analyze', command=self.analyze).grid(row=1, column=2, padx=4, pady=4)
+
+        self.canvas_a = tk.Canvas(frm, width=480, height=320, bg='gray')
+        self.canvas_b = tk.Canvas(frm, width=480, height=320, bg='gray')
+        self.canvas_a.grid(row=2, column=0, padx=4, pady=4)
+        self.canvas_b.grid(row=2, column=1, padx=4, pady=4)
+
+        self.label_avg_a = ttk.Label(frm, text='RGB A: N/A')
+        self.label_avg_b = ttk.Label(frm, text='RGB B: N/A')
+        self.label_avg_a.grid(row=3, column=0)
+        self.label_avg_b.grid(row=3, column=1)
+
+        self.imgtk_a = None
+        self.imgtk_b = None
+        self.img_a = None
+        self.img_b = None
+        self.arr_a = None
+        self.arr_b = None
+
+        self.hist_frames = [ttk.Frame(frm) for _ in range(6)]
+        for i, f in enumerate(self.hist_frames):
+            f.grid(row=4, column=i%2, padx=4, pady=4)
+
+        # графики средних создаются один раз, при анализе меняются только
+        # высоты столбцов и подписи
+        self.charts = [self._make_chart(self.hist_frames[i], f'RGB Image {name}')
+                       for i, name in enumerate('AB')]
+
+    def _make_chart(self, frame, title):
+        fig = Figure(figsize=(3, 2), dpi=100)
+        ax = fig.add_subplot()
+        colors = ['r', 'g', 'b']
+        bars = ax.bar([0, 1, 2], [0, 0, 0], color=colors, alpha=0.7)
+        texts = [ax.text(c, 0, '', ha='center', va='bottom', fontsize=8, fontweight='bold')
+                 for c in range(3)]
+        ax.set_xticks([0, 1, 2])
+        ax.set_xticklabels(['R', 'G', 'B'])
+        ax.set_title(title)
+        canvas = FigureCanvasTkAgg(fig, master=frame)
+        canvas.get_tk_widget().pack()
+        canvas.draw()
+        return ax, bars, texts, canvas
+
+    def load_a(self):
+        path = filedialog.askopenfilename(title='Select Image A', filetypes=[('Image files', '*.png;*.jpg;*.jpeg;*.bmp;*.tif;*.tiff;*.ppm;*.npy')])
+        if path:
+            self.jobs.run(lambda job: load_rgb(path, (480,320))[0], on_done=self.show_a, key='a')
+
+    def show_a(self, arr):
+        self.arr_a = arr
+        self.img_a = Image.fromarray(arr)
+        self.imgtk_a = ImageTk.PhotoImage(self.img_a)
+        self.canvas_a.delete('all')
+        self.canvas_a.create_image(240,160, image=self.imgtk_a)
+
+    def load_b(self):
+        path = filedialog.askopenfilename(title='Select Image B', filetypes=[('Image files', '*.png;*.jpg;*.jpeg;*.bmp;*.tif;*.tiff;*.ppm;*.npy')])
+        if path:
+            self.jobs.run(lambda job: load_rgb(path, (480,320))[0], on_done=self.show_b, key='b')
+
+    def show_b(self, arr):
+        self.arr_b = arr
+        self.img_b = Image.fromarray(arr)
+        self.imgtk_b = ImageTk.PhotoImage(self.img_b)
+        self.canvas_b.delete('all')
+        self.canvas_b.create_image(240,160, image=self.imgtk_b)
+
+    def analyze(self):
+        if self.arr_a is None or self.arr_b is None:
+            messagebox.showwarning('Missing images', 'Please load both images')
+            return
+
+        # Среднее RGB
+        arr_a, arr_b = self.arr_a, self.arr_b
+        self.jobs.run(lambda job: (channel_means(arr_a), channel_means(arr_b)),
+                      on_done=self.show_means, key='analyze')
+
+    def show_means(self, means):
+        avg_a, avg_b = means
+        self.label_avg_a.config(text=f'RGB A: {avg_a[0]:.1f}, {avg_a[1]:.1f}, {avg_a[2]:.1f}')
+        self.label_avg_b.config(text=f'RGB B: {avg_b[0]:.1f}, {avg_b[1]:.1f}, {avg_b[2]:.1f}')
+
+        # Отображение гистограмм 3 столбца (R,G,B) для каждой картинки
+        top = max(avg_a.max(), avg_b.max()) + 20
+        for (ax, bars, texts, canvas), avg in zip(self.charts, [avg_a, avg_b]):
+            for c in range(3):
+                bars[c].set_height(avg[c])
+                texts[c].set_y(avg[c] + 5)
+                texts[c].set_text(f'{avg[c]:.1f}')
+            ax.set_ylim(0, top)
+            canvas.draw_idle()
+
+class LauncherApp(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title('RGB Analyzer')
+        self.geometry('1100x700')
+        self.image_module = ImageRGBAnalyzer(self)
+        self.image_module.frame.pack(fill='both', expand=True)
+
+if __name__ == '__main__':
+    app = LauncherApp()
+    app.mainloop()
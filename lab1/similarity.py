@@ -0,0 +1,139 @@
+# Индекс похожих изображений по признакам цвета (средние RGB + грубая гистограмма).
+# python similarity.py build каталог -o index [-j процессы] [--draft 256]
+# python similarity.py query index изображение [-k 10]
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analysis import color_features
+from batch import imap_bounded, iter_images, read_rgb
+
+BINS = 4
+DIM = 3 + BINS**3
+
+
+def image_features(path, draft=None):
+    return color_features(read_rgb(path, draft)[0], BINS)
+
+
+def _job(args):
+    path, draft = args
+    try:
+        return path, image_features(path, draft), None
+    except (OSError, ValueError) as e:
+        return path, None, str(e)
+
+
+class SimilarityIndex:
+    # features.npy - матрица (N, DIM) float32, открывается через memmap;
+    # paths.txt - путь к изображению для каждой строки
+    def __init__(self, path):
+        self.path = path
+        self.features = np.load(os.path.join(path, 'features.npy'), mmap_mode='r')
+        with open(os.path.join(path, 'paths.txt'), encoding='utf-8') as f:
+            self.paths = f.read().splitlines()
+        self.rows = {os.path.normpath(p): k for k, p in enumerate(self.paths)}
+        self.norms = None
+
+    def __len__(self):
+        return len(self.paths)
+
+    @staticmethod
+    def build(root, path, workers=None, draft=None, on_error=None):
+        # признаки пишутся прямо в файл .npy; строки неудачных изображений
+        # в конце отбрасываются
+        paths = list(iter_images(root))
+        os.makedirs(path, exist_ok=True)
+        out = np.lib.format.open_memmap(os.path.join(path, 'features.tmp.npy'), mode='w+',
+                                        dtype=np.float32, shape=(len(paths), DIM))
+        rows = {p: k for k, p in enumerate(paths)}
+        ok = np.zeros(len(paths), dtype=bool)
+        for p, vec, error in imap_bounded(_job, ((p, draft) for p in paths), workers or os.cpu_count()):
+            if vec is None:
+                if on_error:
+                    on_error(p, error)
+                continue
+            out[rows[p]] = vec
+            ok[rows[p]] = True
+        if not ok.all():
+            kept = np.lib.format.open_memmap(os.path.join(path, 'features.npy'), mode='w+',
+                                             dtype=np.float32, shape=(int(ok.sum()), DIM))
+            kept[:] = out[ok]
+            kept.flush()
+            del out, kept
+            os.remove(os.path.join(path, 'features.tmp.npy'))
+        else:
+            out.flush()
+            del out
+            os.replace(os.path.join(path, 'features.tmp.npy'), os.path.join(path, 'features.npy'))
+        with open(os.path.join(path, 'paths.txt'), 'w', encoding='utf-8') as f:
+            f.writelines(p + '\n' for p, good in zip(paths, ok) if good)
+        return SimilarityIndex(path)
+
+    def vector(self, image):
+        # вектор изображения из индекса (без чтения файла) или посчитанный заново
+        row = self.rows.get(os.path.normpath(image))
+        if row is not None:
+            return np.asarray(self.features[row])
+        return image_features(image)
+
+    def nearest(self, query, k=10, chunk=1 << 16, exclude=None):
+        # k ближайших строк по евклидову расстоянию: |f|^2 - 2 f·q + |q|^2
+        # блоками по chunk строк, в каждом блоке - argpartition
+        # в float64, чтобы у одинаковых векторов расстояние было ровно 0
+        q = np.asarray(query, dtype=np.float64)
+        if self.norms is None:
+            self.norms = np.einsum('ij,ij->i', self.features, self.features, dtype=np.float64)
+        best_d = np.zeros(0)
+        best_i = np.zeros(0, dtype=np.intp)
+        for i in range(0, len(self), chunk):
+            d = self.norms[i:i + chunk] - 2 * (self.features[i:i + chunk] @ q) + q @ q
+            if exclude is not None and i <= exclude < i + chunk:
+                d[exclude - i] = np.inf
+            top = np.argpartition(d, min(k, len(d) - 1))[:k] if len(d) > k else np.arange(len(d))
+            best_d = np.concatenate([best_d, d[top]])
+            best_i = np.concatenate([best_i, top + i])
+            if len(best_d) > k:
+                keep = np.argpartition(best_d, k)[:k]
+                best_d, best_i = best_d[keep], best_i[keep]
+        order = np.argsort(best_d, kind='stable')
+        best_d = np.sqrt(np.maximum(best_d[order], 0))
+        return [(self.paths[j], float(dist)) for j, dist in zip(best_i[order], best_d) if np.isfinite(dist)]
+
+    def similar(self, image, k=10):
+        # ближайшие к изображению, само изображение в ответ не входит
+        return self.nearest(self.vector(image), k, exclude=self.rows.get(os.path.normpath(image)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Индекс похожих изображений по цвету')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_build = sub.add_parser('build', help='построить индекс для каталога')
+    p_build.add_argument('root', help='каталог с изображениями (обходится рекурсивно)')
+    p_build.add_argument('-o', '--index', default='rgb_index', help='каталог индекса')
+    p_build.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='число процессов (1 - без пула)')
+    p_build.add_argument('--draft', type=int, default=None, help='декодировать JPEG в уменьшенном виде')
+    p_query = sub.add_parser('query', help='найти похожие изображения')
+    p_query.add_argument('index', help='каталог индекса')
+    p_query.add_argument('image', help='изображение (из индекса или любое другое)')
+    p_query.add_argument('-k', type=int, default=10, help='число результатов')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        def report(path, error):
+            print(f'Ошибка {path}: {error}', file=sys.stderr)
+
+        index = SimilarityIndex.build(args.root, args.index, args.workers, args.draft, report)
+        print(f'Изображений в индексе: {len(index)}, каталог: {args.index}')
+    else:
+        index = SimilarityIndex(args.index)
+        for path, dist in index.similar(args.image, args.k):
+            print(f'{dist:8.4f}  {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageOps, ImageFilter
+
+
+def apply_filter_chain(img, brightness=1.0, contrast=1.0, blur=0.0, gray=False, invert=False):
+    # Brightness -> Contrast -> GaussianBlur -> оттенки серого -> инверсия
+    img = ImageEnhance.Brightness(img).enhance(brightness)
+    img = ImageEnhance.Contrast(img).enhance(contrast)
+
+    if blur > 0:
+        img = img.filter(ImageFilter.GaussianBlur(radius=blur))
+
+    if gray:
+        img = ImageOps.grayscale(img).convert("RGB")
+
+    if invert:
+        img = ImageOps.invert(img)
+
+    return img
+
+
+INVERT_LUT = [255 - i for i in range(256)]
+
+
+def blend_lut(base, factor):
+    # таблица Image.blend(константа base, изображение, factor) для 8-битного канала:
+    # base + factor·(v - base) в float32, затем отсечение и отбрасывание дробной части
+    v = np.arange(256, dtype=np.float32)
+    temp = np.float32(base) + np.float32(factor) * (v - np.float32(base))
+    return np.clip(temp, 0, 255).astype(np.uint8)
+
+
+class FilterPipeline:
+    # та же цепочка, что apply_filter_chain, но с кешем по стадиям:
+    # яркость+контраст -> размытие -> серый/инверсия. Стадия пересчитывается,
+    # только если изменились ее параметры или параметры предыдущих стадий.
+    # Точечные операции подряд сводятся к одной таблице на 256 значений.
+    def __init__(self, image):
+        self.image = image
+        self._cache = {}
+
+    def _stage(self, name, key, fn):
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        result = fn()
+        self._cache[name] = (key, result)
+        return result
+
+    def tone_lut(self, brightness, contrast):
+        # Brightness - смешивание с черным, Contrast - со средним серым
+        # изображения после Brightness (как в ImageEnhance)
+        lut_b = blend_lut(0, brightness)
+
+        def mean_gray():
+            hist = self.image.point(list(lut_b) * 3).convert("L").histogram()
+            return int(np.dot(np.arange(256), hist) / sum(hist) + 0.5)
+
+        mean = self._stage("mean", brightness, mean_gray)
+        return blend_lut(mean, contrast)[lut_b]
+
+    def run(self, brightness=1.0, contrast=1.0, blur=0.0, gray=False, invert=False):
+        lut = self.tone_lut(brightness, contrast)
+        if blur <= 0 and not gray:
+            if invert:
+                lut = 255 - lut
+            return self._stage("final", (brightness, contrast, invert),
+                               lambda: self.image.point(list(lut) * 3))
+
+        img = self._stage("tone", (brightness, contrast), lambda: self.image.point(list(lut) * 3))
+        if blur > 0:
+            img = self._stage("blur", (brightness, contrast, blur),
+                              lambda: img.filter(ImageFilter.GaussianBlur(radius=blur)))
+        if gray:
+            img = img.convert("L")
+            if invert:
+                img = img.point(INVERT_LUT)
+            return img.convert("RGB")
+        if invert:
+            img = img.point(INVERT_LUT * 3)
+        return img
+
+
+def blur_margin(radius, passes=3):
+    # сколько строк за краем полосы влияет на GaussianBlur PIL
+    # (passes проходов box-фильтра радиусом ~radius)
+    if radius <= 0:
+        return 0
+    return passes * (int(np.ceil(radius)) + 2)
+
+
+def process_full_resolution(path, brightness=1.0, contrast=1.0, blur=0.0, gray=False, invert=False,
+                            strip_rows=256, workers=None):
+    # повтор цепочки фильтров для исходного файла в полном разрешении.
+    # Изображение обрабатывается горизонтальными полосами с перекрытием
+    # (чтобы размытие на стыках совпадало с обработкой целиком) в нескольких
+    # потоках; готовые полосы записываются обратно в декодированное
+    # изображение, так что в памяти одна копия пикселей плюс полосы в работе.
+    img = Image.open(path)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img.load()
+    W, H = img.size
+    bounds = [(y, min(y + strip_rows, H)) for y in range(0, H, strip_rows)]
+    workers = workers or os.cpu_count()
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        # среднее серое после яркости - по всему изображению, как в ImageEnhance.Contrast
+        lut_b = list(blend_lut(0, brightness)) * 3
+
+        def gray_hist(box):
+            return np.array(img.crop((0, box[0], W, box[1])).point(lut_b).convert("L").histogram())
+
+        hist = sum(ex.map(gray_hist, bounds))
+        mean = int(np.dot(np.arange(256), hist) / hist.sum() + 0.5)
+        lut = blend_lut(mean, contrast)[blend_lut(0, brightness)]
+        margin = blur_margin(blur)
+
+        def process(src, top, rows):
+            out = src.point(list(lut) * 3)
+            if blur > 0:
+                out = out.filter(ImageFilter.GaussianBlur(radius=blur))
+            out = out.crop((0, top, W, top + rows))
+            if gray:
+                out = out.convert("L")
+                if invert:
+                    out = out.point(INVERT_LUT)
+                return out.convert("RGB")
+            if invert:
+                out = out.point(INVERT_LUT * 3)
+            return out
+
+        # полоса i записывается только после того, как вырезаны входы всех
+        # полос, чьи перекрытия ее задевают (ceil(margin / strip_rows) следующих):
+        # они еще должны содержать исходные пиксели. Вперед вырезается еще
+        # workers полос, чтобы все потоки были заняты
+        lag = -(-margin // strip_rows)
+        pending = deque()
+        for y0, y1 in bounds:
+            a, b = max(0, y0 - margin), min(H, y1 + margin)
+            src = img.crop((0, a, W, b))
+            pending.append((ex.submit(process, src, y0 - a, y1 - y0), y0))
+            while len(pending) > lag + workers:
+                fut, py0 = pending.popleft()
+                img.paste(fut.result(), (0, py0))
+        while pending:
+            fut, py0 = pending.popleft()
+            img.paste(fut.result(), (0, py0))
+    return img
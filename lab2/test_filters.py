@@ -0,0 +1,23 @@
+# Проверки обработки изображения полосами: python -m pytest lab2
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from filters import apply_filter_chain, process_full_resolution
+
+
+@pytest.mark.parametrize("blur, strip_rows", [(0, 64), (2, 64), (90, 64), (120, 256)])
+def test_full_resolution_matches_whole_image(tmp_path, blur, strip_rows):
+    # полосы с перекрытием (в том числе больше высоты полосы) дают то же
+    # изображение, что и обработка целиком
+    rng = np.random.default_rng(0)
+    img = Image.fromarray(rng.integers(0, 256, (600, 320, 3), dtype=np.uint8))
+    path = str(tmp_path / "src.png")
+    img.save(path)
+    out = process_full_resolution(path, 1.3, 0.8, blur, False, True, strip_rows=strip_rows, workers=2)
+    assert out.tobytes() == apply_filter_chain(img, 1.3, 0.8, blur, False, True).tobytes()
@@ -0,0 +1,290 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+def resolut(W_mm, H_mm, base_res=400):
+    aspect = W_mm / H_mm
+    Hres = base_res
+    Wres = int(base_res * aspect)
+    return Wres, Hres
+
+
+def grid_axes(W_mm, H_mm, Wres, Hres):
+    x = np.linspace(-W_mm/2, W_mm/2, Wres)
+    y = np.linspace(H_mm/2, -H_mm/2, Hres)
+    return x, y
+
+
+def illuminance(X, Y, xL, yL, zL, I0):
+    dx = X - xL
+    dy = Y - yL
+    R = np.sqrt(dx**2 + dy**2 + zL**2)
+    cos_a = zL / R
+    E = np.zeros_like(R)
+    valid = cos_a > 0
+    E[valid] = I0 * cos_a[valid]**2 / (R[valid]**2)
+    return E
+
+
+def compute(W_mm, H_mm, xL, yL, zL, I0, Wres, Hres):
+    x, y = grid_axes(W_mm, H_mm, Wres, Hres)
+    X, Y = np.meshgrid(x, y)
+    E = illuminance(X, Y, xL, yL, zL, I0)
+    return X, Y, E
+
+
+@dataclass
+class AdaptiveField:
+    # квадродерево освещенности: на уровне l пластина разбита на
+    # (ny0·2^l) x (nx0·2^l) ячеек, ячейки-листья хранят значения в углах
+    # (верх-лево, верх-право, низ-лево, низ-право)
+    W_mm: float
+    H_mm: float
+    nx0: int
+    ny0: int
+    leaves: list = field(default_factory=list)   # по уровням: (iy, ix)
+    corners: list = field(default_factory=list)  # по уровням: (n, 4)
+    n_evals: int = 0
+    peak: float = 0.0
+
+    def cell_size(self, level):
+        return self.W_mm / (self.nx0 << level), self.H_mm / (self.ny0 << level)
+
+    def rasterize(self, Wres, Hres):
+        # значения в узлах той же сетки, что и у compute(), билинейно по листьям
+        x, y = grid_axes(self.W_mm, self.H_mm, Wres, Hres)
+        X, Y = np.meshgrid(x, y)
+        X, Y = X.ravel(), Y.ravel()
+        E = np.zeros(len(X))
+        todo = np.ones(len(X), dtype=bool)
+        for level in range(len(self.leaves) - 1, -1, -1):
+            iy, ix = self.leaves[level]
+            if len(iy) == 0:
+                continue
+            nx, ny = self.nx0 << level, self.ny0 << level
+            hx, hy = self.cell_size(level)
+            px = np.clip(((X + self.W_mm/2) / hx).astype(int), 0, nx - 1)
+            py = np.clip(((self.H_mm/2 - Y) / hy).astype(int), 0, ny - 1)
+            keys = iy.astype(np.int64) * nx + ix
+            order = np.argsort(keys)
+            keys = keys[order]
+            pk = py.astype(np.int64) * nx + px
+            pos = np.minimum(np.searchsorted(keys, pk), len(keys) - 1)
+            hit = todo & (keys[pos] == pk)
+            c = self.corners[level][order[pos[hit]]]
+            u = (X[hit] + self.W_mm/2) / hx - px[hit]
+            v = (self.H_mm/2 - Y[hit]) / hy - py[hit]
+            E[hit] = (c[:, 0] * (1 - u) * (1 - v) + c[:, 1] * u * (1 - v)
+                      + c[:, 2] * (1 - u) * v + c[:, 3] * u * v)
+            todo &= ~hit
+        return E.reshape(Hres, Wres)
+
+
+def compute_adaptive(W_mm, H_mm, xL, yL, zL, I0, tol=1e-3, base_cells=8, max_level=8, min_level=1):
+    # адаптивная сетка: ячейка делится на 4, пока значения в ее центре и
+    # серединах сторон отличаются от интерполяции по углам больше, чем на
+    # tol·(максимум найденной E). Узлы общие для соседних ячеек и считаются один раз.
+    ny0 = base_cells
+    nx0 = max(1, int(round(base_cells * W_mm / H_mm)))
+    result = AdaptiveField(W_mm, H_mm, nx0, ny0)
+    NX = nx0 << (max_level + 1)
+    NY = ny0 << (max_level + 1)
+    hx = W_mm / NX
+    hy = H_mm / NY
+    keys = np.zeros(0, dtype=np.int64)
+    vals = np.zeros(0)
+
+    def sample(gy, gx):
+        # значения в узлах самой мелкой решетки (gy, gx) с кешированием
+        nonlocal keys, vals
+        k = gy.astype(np.int64) * (NX + 1) + gx
+        new = np.unique(k[~np.isin(k, keys)])
+        if len(new):
+            ny_, nx_ = np.divmod(new, NX + 1)
+            E_new = illuminance(-W_mm/2 + nx_ * hx, H_mm/2 - ny_ * hy, xL, yL, zL, I0)
+            keys = np.concatenate([keys, new])
+            vals = np.concatenate([vals, E_new])
+            order = np.argsort(keys)
+            keys, vals = keys[order], vals[order]
+        return vals[np.searchsorted(keys, k)]
+
+    iy, ix = np.divmod(np.arange(nx0 * ny0), nx0)
+    for level in range(max_level + 1):
+        step = 1 << (max_level + 1 - level)
+        half = step // 2
+        gy, gx = iy * step, ix * step
+        c = np.stack([sample(gy, gx), sample(gy, gx + step),
+                      sample(gy + step, gx), sample(gy + step, gx + step)], axis=1)
+        if level == max_level:
+            result.leaves.append((iy, ix))
+            result.corners.append(c)
+            break
+        mid = np.stack([sample(gy + half, gx + half), sample(gy, gx + half),
+                        sample(gy + step, gx + half), sample(gy + half, gx),
+                        sample(gy + half, gx + step)], axis=1)
+        interp = np.stack([c.mean(axis=1), (c[:, 0] + c[:, 1]) / 2, (c[:, 2] + c[:, 3]) / 2,
+                           (c[:, 0] + c[:, 2]) / 2, (c[:, 1] + c[:, 3]) / 2], axis=1)
+        err = np.abs(mid - interp).max(axis=1)
+        refine = (err > tol * vals.max()) | (level < min_level)
+        result.leaves.append((iy[~refine], ix[~refine]))
+        result.corners.append(c[~refine])
+        iy = np.concatenate([2 * iy[refine] + dy for dy in (0, 0, 1, 1)])
+        ix = np.concatenate([2 * ix[refine] + dx for dx in (0, 1, 0, 1)])
+        if len(iy) == 0:
+            break
+    result.n_evals = len(keys)
+    result.peak = vals.max()
+    return result
+
+
+def circle_bbox(x, y, rc, center=(0.0, 0.0)):
+    # индексы столбцов и строк сетки, попадающих в квадрат, описанный вокруг круга
+    xc, yc = center
+    cols = np.nonzero(np.abs(x - xc) <= rc)[0]
+    rows = np.nonzero(np.abs(y - yc) <= rc)[0]
+    if len(cols) == 0 or len(rows) == 0:
+        return 0, 0, 0, 0
+    return rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+
+
+def iter_circle_rows(W_mm, H_mm, xL, yL, zL, I0, Wres, Hres, rc,
+                     center=(0.0, 0.0), chunk_rows=256):
+    # обход круга порциями строк внутри его описанного квадрата:
+    # (r0, r1, c0, c1, E, mask) - память зависит от размера круга, а не пластины
+    xc, yc = center
+    x, y = grid_axes(W_mm, H_mm, Wres, Hres)
+    r_lo, r_hi, c0, c1 = circle_bbox(x, y, rc, center)
+    for r0 in range(r_lo, r_hi, chunk_rows):
+        r1 = min(r0 + chunk_rows, r_hi)
+        X, Y = np.meshgrid(x[c0:c1], y[r0:r1])
+        E = illuminance(X, Y, xL, yL, zL, I0)
+        mask = np.sqrt((X - xc)**2 + (Y - yc)**2) <= rc
+        yield r0, r1, c0, c1, E, mask
+
+
+def circle_stats_analytic(xL, yL, zL, I0, rc, center=(0.0, 0.0)):
+    # E = I0·cos²α/R² = I0·zL²/(zL² + ρ²)², ρ - расстояние до проекции источника.
+    # E убывает с ρ, поэтому экстремумы - в ближайшей и дальней точках круга.
+    # Среднее: интеграл по кольцам радиуса r вокруг центра круга сводится к
+    # π·[(q/(2s) - 1)/sqrt(q² + 4sD²)] по q от s - D² до rc² + s - D²,
+    # где s = zL², D - расстояние от центра круга до проекции источника.
+    if zL <= 0:
+        return 0.0, 0.0, 0.0
+    xc, yc = center
+    s = zL**2
+    D = np.hypot(xL - xc, yL - yc)
+    rho_min = max(0.0, D - rc)
+    rho_max = D + rc
+
+    def E_at(rho):
+        return I0 * s / (s + rho**2)**2
+
+    def F(q):
+        return (q / (2*s) - 1) / np.sqrt(q**2 + 4*s*D**2)
+
+    q0 = s - D**2
+    q1 = rc**2 + s - D**2
+    Eavg = I0 * s * (F(q1) - F(q0)) / rc**2
+    return E_at(rho_min), E_at(rho_max), Eavg
+
+
+def circle_stats(W_mm, H_mm, xL, yL, zL, I0, Wres, Hres, rc,
+                 center=(0.0, 0.0), mode="grid", chunk_rows=256):
+    # (Emax, Emin, Eavg) в пределах круга без построения полной сетки.
+    # mode="grid": те же узлы сетки, что и в compute(); совпадает с полным
+    #   расчетом с точностью до порядка суммирования (отн. погрешность ~1e-12).
+    # mode="analytic": точные значения для непрерывного круга; отличие от
+    #   сетки - ошибка дискретизации: для среднего порядка h/rc, для
+    #   экстремумов не больше max|grad E|·h, h - шаг сетки. Если круг выходит
+    #   за пределы пластины, считается по сетке.
+    xc, yc = center
+    inside = abs(xc) + rc <= W_mm/2 and abs(yc) + rc <= H_mm/2
+    if mode == "analytic" and inside:
+        return circle_stats_analytic(xL, yL, zL, I0, rc, center)
+    if mode not in ("grid", "analytic"):
+        raise ValueError(f"неизвестный режим: {mode}")
+
+    Emax, Emin, total, count = -np.inf, np.inf, 0.0, 0
+    for _, _, _, _, E, mask in iter_circle_rows(W_mm, H_mm, xL, yL, zL, I0, Wres, Hres,
+                                                rc, center, chunk_rows):
+        E_circle = E[mask]
+        if len(E_circle) == 0:
+            continue
+        Emax = max(Emax, np.max(E_circle))
+        Emin = min(Emin, np.min(E_circle))
+        total += np.sum(E_circle)
+        count += len(E_circle)
+    if count == 0:
+        return np.nan, np.nan, np.nan
+    return Emax, Emin, total / count
+
+
+def circle_image(W_mm, H_mm, xL, yL, zL, I0, Wres, Hres, rc, E_max,
+                 center=(0.0, 0.0), chunk_rows=256):
+    # 8-битная картинка освещенности внутри круга (вне круга 0), нормированная на E_max
+    if E_max <= 0 or np.isnan(E_max):
+        E_max = 1e-12
+    img = np.zeros((Hres, Wres), dtype=np.uint8)
+    for r0, r1, c0, c1, E, mask in iter_circle_rows(W_mm, H_mm, xL, yL, zL, I0, Wres, Hres,
+                                                    rc, center, chunk_rows):
+        E[~mask] = 0
+        img[r0:r1, c0:c1] = (E / E_max * 255).astype(np.uint8)
+    return img
+
+
+def circle_section(W_mm, H_mm, xL, yL, zL, I0, Wres, Hres, rc, row, center=(0.0, 0.0)):
+    # одна строка сетки row с обнуленными точками вне круга
+    xc, yc = center
+    x, y = grid_axes(W_mm, H_mm, Wres, Hres)
+    Y = np.full_like(x, y[row])
+    E = illuminance(x, Y, xL, yL, zL, I0)
+    E[np.sqrt((x - xc)**2 + (Y - yc)**2) > rc] = 0
+    return E
+
+
+def source_arrays(sources):
+    # источники: последовательность (xL, yL, zL, I0) или массив (N, 4)
+    src = np.asarray(sources, dtype=float).reshape(-1, 4)
+    return src[:, 0], src[:, 1], src[:, 2], src[:, 3]
+
+
+def illuminance_multi(px, py, sources, max_bytes=64 << 20):
+    # суммарная освещенность от N точечных источников в M точках.
+    # Считается блоками (точки x источники) так, чтобы временные массивы
+    # занимали не больше max_bytes - тысячи светильников помещаются в память.
+    px = np.asarray(px, dtype=float)
+    shape = px.shape
+    px = px.ravel()
+    py = np.broadcast_to(np.asarray(py, dtype=float), shape).ravel()
+    xL, yL, zL, I0 = source_arrays(sources)
+    # источники с zL <= 0 пластину не освещают (как в illuminance); при zL = 0
+    # над самой точкой R2 = 0 и вклад был бы 0/0
+    above = zL > 0
+    xL, yL, zL, I0 = xL[above], yL[above], zL[above], I0[above]
+    w = I0 * zL**2
+    E = np.zeros(len(px))
+    if len(px) == 0 or len(xL) == 0:
+        return E.reshape(shape)
+
+    # ~4 временных массива float64 размером (точки x источники)
+    cells = max(1, max_bytes // (4 * 8))
+    src_chunk = max(1, min(len(xL), cells))
+    pt_chunk = max(1, cells // src_chunk)
+    for p0 in range(0, len(px), pt_chunk):
+        X = px[p0:p0 + pt_chunk, None]
+        Y = py[p0:p0 + pt_chunk, None]
+        for k0 in range(0, len(xL), src_chunk):
+            k = slice(k0, k0 + src_chunk)
+            # I0·cos²α/R² = I0·zL²/R⁴
+            R2 = (X - xL[k])**2 + (Y - yL[k])**2 + zL[k]**2
+            E[p0:p0 + pt_chunk] += (w[k] / (R2 * R2)).sum(axis=1)
+    return E.reshape(shape)
+
+
+def compute_multi(W_mm, H_mm, sources, Wres, Hres, max_bytes=64 << 20):
+    # то же, что compute(), но для набора источников
+    x, y = grid_axes(W_mm, H_mm, Wres, Hres)
+    X, Y = np.meshgrid(x, y)
+    E = illuminance_multi(X, Y, sources, max_bytes)
+    return X, Y, E
@@ -0,0 +1,137 @@
+# Перебор параметров расчета освещенности с дисковым кешем полей E.
+# python sweep.py --xL=-200:200:5 --zL=300,800 --rc=50,80 -o sweep.csv
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from common.cache import ArrayCache
+from illum import resolut, compute, circle_bbox, grid_axes, illuminance_multi
+
+PARAMS = ("W", "H", "xL", "yL", "zL", "I0", "rc")
+# значения по умолчанию - как у ползунков в main.py
+DEFAULTS = {"W": 500, "H": 300, "xL": 0, "yL": 0, "zL": 800, "I0": 100, "rc": 80}
+CONTROL_POINTS = ("center", "X_plus", "X_minus", "Y_plus", "Y_minus")
+
+
+class FieldCache(ArrayCache):
+    # поля E при I0 = 1, ключ - sha256 от параметров геометрии; хранение,
+    # атомарная запись и вытеснение LRU - common.cache.ArrayCache
+    def __init__(self, path, max_bytes=1 << 30):
+        super().__init__(path, max_bytes)
+
+    @staticmethod
+    def key(W, H, xL, yL, zL, Wres, Hres):
+        return ArrayCache.key("lab3-field", float(W), float(H), float(xL), float(yL), float(zL),
+                              int(Wres), int(Hres))
+
+    def get(self, key):
+        arrays = super().get(key)
+        return None if arrays is None else arrays.get("E")
+
+    def put(self, key, E):
+        super().put(key, {"E": E})
+
+
+def parse_range(text):
+    # "a:b:n" - n точек от a до b включительно, "a,b,c" - список, "a" - одно значение
+    if ":" in text:
+        a, b, n = text.split(":")
+        return list(np.linspace(float(a), float(b), int(n)))
+    return [float(v) for v in text.split(",")]
+
+
+def field_stats(E, W, H, Wres, Hres, rc, center=(0.0, 0.0)):
+    xc, yc = center
+    x, y = grid_axes(W, H, Wres, Hres)
+    r0, r1, c0, c1 = circle_bbox(x, y, rc, center)
+    X, Y = np.meshgrid(x[c0:c1], y[r0:r1])
+    E_circle = E[r0:r1, c0:c1][np.sqrt((X - xc)**2 + (Y - yc)**2) <= rc]
+    if len(E_circle) == 0:
+        return np.nan, np.nan, np.nan
+    return np.max(E_circle), np.min(E_circle), np.mean(E_circle)
+
+
+def _run_group(job):
+    # одна геометрия (W, H, xL, yL, zL) и все ее комбинации (I0, rc):
+    # E пропорциональна I0, поэтому поле хранится при I0 = 1 и масштабируется
+    (W, H, xL, yL, zL), combos, base_res, cache_dir, cache_bytes = job
+    Wres, Hres = resolut(W, H, base_res)
+    cache = FieldCache(cache_dir, cache_bytes) if cache_dir else None
+    key = FieldCache.key(W, H, xL, yL, zL, Wres, Hres)
+    E = cache.get(key) if cache else None
+    hit = E is not None
+    if E is None:
+        E = compute(W, H, xL, yL, zL, 1.0, Wres, Hres)[2]
+        if cache:
+            cache.put(key, E)
+
+    rows = []
+    for I0, rc in combos:
+        Emax, Emin, Eavg = field_stats(E, W, H, Wres, Hres, rc)
+        pts = np.array([(0.0, 0.0), (rc, 0.0), (-rc, 0.0), (0.0, rc), (0.0, -rc)])
+        E_pts = illuminance_multi(pts[:, 0], pts[:, 1], [(xL, yL, zL, 1.0)])
+        row = {"W": W, "H": H, "xL": xL, "yL": yL, "zL": zL, "I0": I0, "rc": rc,
+               "Wres": Wres, "Hres": Hres,
+               "Emax": I0 * Emax, "Emin": I0 * Emin, "Eavg": I0 * Eavg}
+        row.update({f"E_{name}": I0 * v for name, v in zip(CONTROL_POINTS, E_pts)})
+        rows.append(row)
+    return rows, hit
+
+
+def sweep(ranges, base_res=400, workers=None, cache_dir="illum_cache", cache_bytes=1 << 30):
+    # ranges: {параметр: список значений}; отсутствующие берутся из DEFAULTS.
+    # Возвращает (строки таблицы, число полей, взятых из кеша)
+    values = [ranges.get(p, [DEFAULTS[p]]) for p in PARAMS]
+    groups = {}
+    for W, H, xL, yL, zL, I0, rc in product(*values):
+        groups.setdefault((W, H, xL, yL, zL), []).append((I0, rc))
+    jobs = [(geom, combos, base_res, cache_dir, cache_bytes) for geom, combos in groups.items()]
+
+    workers = workers or os.cpu_count()
+    if workers <= 1 or len(jobs) <= 1:
+        results = list(map(_run_group, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as ex:
+            results = list(ex.map(_run_group, jobs))
+    rows = [row for group_rows, _ in results for row in group_rows]
+    hits = sum(hit for _, hit in results)
+    return rows, hits
+
+
+def write_table(rows, path):
+    if not rows:
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Перебор параметров освещенности с кешированием")
+    for p in PARAMS:
+        parser.add_argument(f"--{p}", type=parse_range, default=None,
+                            help=f"значения {p}: a:b:n, a,b,c или одно число (по умолчанию {DEFAULTS[p]})")
+    parser.add_argument("--res", type=int, default=400, help="разрешение по высоте (как resolut)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="число процессов")
+    parser.add_argument("--cache", default="illum_cache", help="каталог кеша ('' - без кеша)")
+    parser.add_argument("--cache-mb", type=float, default=1024, help="предельный размер кеша, МБ")
+    parser.add_argument("-o", "--output", default="illum_calc_results/sweep.csv", help="CSV-таблица результатов")
+    args = parser.parse_args(argv)
+
+    ranges = {p: getattr(args, p) for p in PARAMS if getattr(args, p) is not None}
+    rows, hits = sweep(ranges, args.res, args.workers, args.cache, int(args.cache_mb * (1 << 20)))
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    write_table(rows, args.output)
+    print(f"Строк: {len(rows)}, полей из кеша: {hits}, таблица: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from common.antialias import edge_mask, stratified_offsets, supersample
+from common.progressive import STEPS, level_masks, upsample
+
+def compute_resolution(W_mm, H_mm, base_res=100):
+    aspect = W_mm / H_mm
+    Hres = base_res
+    Wres = int(base_res * aspect)
+    return Wres, Hres
+
+def make_scene(xC, yC, zC, R, zO, lights, kd, ks, n):
+    return {'C': np.array([xC, yC, zC], dtype=float), 'R': float(R), 'zO': float(zO),
+            'lights': lights, 'kd': float(kd), 'ks': float(ks), 'n': float(n)}
+
+def light_arrays(lights):
+    # источники света -> массивы (K, 3) и (K,)
+    pos = np.array([L['pos'] for L in lights], dtype=float).reshape(-1, 3)
+    I0 = np.array([L['I0'] for L in lights], dtype=float)
+    return pos, I0
+
+def _normalize(v):
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+def light_terms(P, N, V, lights, kd, ks, n):
+    # вклад каждого источника: (M, K), Блинн-Фонг сразу для всех точек и источников
+    pos, I0 = light_arrays(lights)
+    L_vec = _normalize(pos[None, :, :] - P[:, None, :])
+    H_vec = _normalize(L_vec + V[:, None, :])
+    NL = np.maximum(0, np.einsum('mkc,mc->mk', L_vec, N))
+    NH = np.maximum(0, np.einsum('mkc,mc->mk', H_vec, N))
+    return kd * I0 * NL + ks * I0 * NH ** n
+
+def shade(P, N, V, lights, kd, ks, n):
+    if len(lights) == 0:
+        return np.zeros(P.shape[:-1])
+    return light_terms(P, N, V, lights, kd, ks, n).sum(axis=1)
+
+def surface_points(scene, px, py):
+    # точки видимой (обращенной к +z) полусферы под пикселями (px, py)
+    C, R = scene['C'], scene['R']
+    dx, dy = px - C[0], py - C[1]
+    mask = dx ** 2 + dy ** 2 <= R ** 2
+    pz = C[2] + np.sqrt(np.maximum(R ** 2 - dx ** 2 - dy ** 2, 0))
+    P = np.stack([px, py, pz], axis=-1)
+    return mask, P
+
+def _geometry(scene, P):
+    C = scene['C']
+    O = np.array([0, 0, scene['zO']], dtype=float)
+    return _normalize(P - C), _normalize(O - P)
+
+def shade_points(scene, P):
+    N, V = _geometry(scene, P)
+    return shade(P, N, V, scene['lights'], scene['kd'], scene['ks'], scene['n'])
+
+def pixel_terms(scene, px, py):
+    # вклад каждого источника в пикселе (для отладки); None вне сферы
+    mask, P = surface_points(scene, np.array([float(px)]), np.array([float(py)]))
+    if not mask[0]:
+        return None
+    N, V = _geometry(scene, P)
+    return light_terms(P, N, V, scene['lights'], scene['kd'], scene['ks'], scene['n'])[0]
+
+def render_pixels(scene, px, py):
+    # яркость в произвольном наборе пикселей; вне сферы 0
+    px = np.asarray(px, dtype=float)
+    py = np.asarray(py, dtype=float)
+    mask, P = surface_points(scene, px, py)
+    I = np.zeros(px.shape)
+    I[mask] = shade_points(scene, P[mask])
+    return I
+
+def make_grid(W_mm, H_mm, base_res=100):
+    Wres, Hres = compute_resolution(W_mm, H_mm, base_res)
+    x = np.linspace(-W_mm/2, W_mm/2, Wres)
+    y = np.linspace(-H_mm/2, H_mm/2, Hres)
+    return x, y
+
+def render_brightness(scene, W_mm, H_mm, base_res=100):
+    x, y = make_grid(W_mm, H_mm, base_res)
+    X, Y = np.meshgrid(x, y)
+    return render_pixels(scene, X, Y)
+
+def iter_tiles(Hres, Wres, tile=32):
+    for r0 in range(0, Hres, tile):
+        for c0 in range(0, Wres, tile):
+            yield r0, min(r0 + tile, Hres), c0, min(c0 + tile, Wres)
+
+def render_tile(scene, x, y, box):
+    r0, r1, c0, c1 = box
+    X, Y = np.meshgrid(x[c0:c1], y[r0:r1])
+    return box, render_pixels(scene, X, Y)
+
+def render_tiled(scene, W_mm, H_mm, base_res=100, tile=32, workers=1,
+                 on_tile=None, cancel=None, trace=None, trace_pixels=()):
+    # кадр режется на плитки tile x tile, плитки считаются в пуле процессов.
+    # on_tile(box, values) получает каждую готовую плитку, cancel - объект с
+    # is_set() (threading.Event): при отмене возвращается None.
+    # trace(i, j, terms) вызывается для пикселей из trace_pixels с вкладами
+    # отдельных источников.
+    x, y = make_grid(W_mm, H_mm, base_res)
+    brightness = np.zeros((len(y), len(x)))
+    boxes = list(iter_tiles(len(y), len(x), tile))
+
+    def accept(box, values):
+        r0, r1, c0, c1 = box
+        brightness[r0:r1, c0:c1] = values
+        if on_tile is not None:
+            on_tile(box, values)
+        if trace is not None:
+            for i, j in trace_pixels:
+                if r0 <= i < r1 and c0 <= j < c1:
+                    trace(i, j, pixel_terms(scene, x[j], y[i]))
+
+    if workers <= 1:
+        for box in boxes:
+            if cancel is not None and cancel.is_set():
+                return None
+            accept(*render_tile(scene, x, y, box))
+        return brightness
+
+    ex = ProcessPoolExecutor(max_workers=min(workers, len(boxes)))
+    try:
+        futures = [ex.submit(render_tile, scene, x, y, box) for box in boxes]
+        for fut in as_completed(futures):
+            if cancel is not None and cancel.is_set():
+                return None
+            accept(*fut.result())
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+    return brightness
+
+def render_progressive(scene, W_mm, H_mm, base_res=100, steps=STEPS,
+                       on_level=None, cancel=None, trace=None, trace_pixels=()):
+    # кадр уровнями 1/8, 1/4, 1/2, 1 (см. common.progressive): on_level(step,
+    # превью) получает увеличенное до полного размера изображение уровня.
+    # Итог совпадает с render_brightness; при отмене возвращается None
+    x, y = make_grid(W_mm, H_mm, base_res)
+    X, Y = np.meshgrid(x, y)
+    brightness = np.zeros(X.shape)
+    for step, mask in level_masks(*X.shape, steps):
+        if cancel is not None and cancel.is_set():
+            return None
+        brightness[mask] = render_pixels(scene, X[mask], Y[mask])
+        if on_level is not None:
+            on_level(step, upsample(brightness, step))
+    if trace is not None:
+        for i, j in trace_pixels:
+            if 0 <= i < len(y) and 0 <= j < len(x):
+                trace(i, j, pixel_terms(scene, x[j], y[i]))
+    return brightness
+
+def geometry_buffers(scene, W_mm, H_mm, base_res=100):
+    # буферы видимости, не зависящие от источников и наблюдателя: номер сферы
+    # (-1 - фон), точки поверхности (их z - это z-буфер) и нормали
+    x, y = make_grid(W_mm, H_mm, base_res)
+    X, Y = np.meshgrid(x, y)
+    mask, P = surface_points(scene, X, Y)
+    N = np.zeros(P.shape)
+    N[mask] = _normalize(P[mask] - scene['C'])
+    return {'sphere_ids': np.where(mask, 0, -1), 'points': P, 'normals': N}
+
+def shade_buffers(scene, buffers):
+    # только освещение по готовой геометрии, результат совпадает с render_brightness
+    mask = buffers['sphere_ids'] >= 0
+    P, N = buffers['points'][mask], buffers['normals'][mask]
+    V = _normalize(np.array([0, 0, scene['zO']], dtype=float) - P)
+    I = np.zeros(mask.shape)
+    I[mask] = shade(P, N, V, scene['lights'], scene['kd'], scene['ks'], scene['n'])
+    return I
+
+def render_cached(scene, W_mm, H_mm, base_res=100, cache=None, render=None):
+    # (яркость, источник) с кешем common.cache.ArrayCache: 'cache' - готовый
+    # кадр, 'relight' - геометрия из кеша, пересчитано только освещение,
+    # 'render' - полный рендер функцией render() (по умолчанию
+    # render_brightness). Если render() вернул None (отмена) - (None, 'render')
+    if render is None:
+        render = lambda: render_brightness(scene, W_mm, H_mm, base_res)
+    if cache is None:
+        return render(), 'render'
+    key = cache.key('lab4', scene, W_mm, H_mm, base_res)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit['brightness'], 'cache'
+    geo_key = cache.key('lab4-geometry', scene['C'], scene['R'], W_mm, H_mm, base_res)
+    buffers = cache.get(geo_key)
+    if buffers is not None:
+        brightness, kind = shade_buffers(scene, buffers), 'relight'
+    else:
+        brightness, kind = render(), 'render'
+        if brightness is None:
+            return None, kind
+        cache.put(geo_key, geometry_buffers(scene, W_mm, H_mm, base_res))
+    cache.put(key, {'brightness': brightness})
+    return brightness, kind
+
+def antialias(scene, W_mm, H_mm, brightness, base_res=100, samples=2, jitter=True):
+    # адаптивное сглаживание готового кадра (common.antialias): пиксели на
+    # краю сферы пересчитываются по samples x samples выборкам
+    x, y = make_grid(W_mm, H_mm, base_res)
+    # шаг пикселя; вдоль оси из одного пикселя выборки не разносятся
+    sx = W_mm / (len(x) - 1) if len(x) > 1 else 0
+    sy = H_mm / (len(y) - 1) if len(y) > 1 else 0
+    if sx == 0 and sy == 0:
+        return brightness
+    X, Y = np.meshgrid(x, y)
+    mask, _ = surface_points(scene, X, Y)
+    edges = edge_mask(mask)
+    result = brightness.copy()
+    result[edges] = supersample(lambda px, py: render_pixels(scene, px, py), X[edges], Y[edges],
+                                sx, sy, stratified_offsets(samples, jitter))
+    return result
+
+def to_image(brightness):
+    return (brightness / np.max(brightness) * 255).astype(np.uint8)
+
+def control_points(scene):
+    xC, yC, zC = scene['C']
+    R = scene['R']
+    points = np.array([
+        (xC, yC, zC + R),  # Верхняя точка
+        (xC + R, yC, zC),  # Экватор по X
+        (xC, yC + R, zC)   # Экватор по Y
+    ])
+    return points, shade_points(scene, points)
@@ -0,0 +1,156 @@
+# Иерархия ограничивающих объемов (BVH) для сцен из большого числа сфер.
+# Обход в глубину сразу для пакета лучей: у каждого луча свой стек узлов, за
+# шаг каждый активный луч снимает со стека один узел, и все такие пары
+# (луч, узел) проверяются одним векторным тестом луч-параллелепипед, в листьях -
+# тест луч-сфера. Ближний потомок обходится первым, дальние узлы отсекаются по
+# уже найденному пересечению, поэтому стоимость луча растет примерно как
+# log(число сфер), а не линейно.
+import numpy as np
+
+
+def ray_sphere_t(origins, dirs, centers, radii, eps=1e-3):
+    # ближайшее t > eps для пар (луч k, сфера k), np.inf - нет пересечения;
+    # та же формула, что в raytrace.intersect_spheres
+    oc = origins - centers
+    a = np.sum(dirs * dirs, axis=1)
+    b = 2 * np.einsum('pk,pk->p', oc, dirs)
+    c = np.einsum('pk,pk->p', oc, oc) - radii * radii
+    disc = b * b - 4 * a * c
+    hit = disc >= 0
+    sq = np.sqrt(np.where(hit, disc, 0))
+    t1 = (-b - sq) / (2 * a)
+    t2 = (-b + sq) / (2 * a)
+    t = np.where(t1 > eps, t1, np.where(t2 > eps, t2, np.inf))
+    t[~hit] = np.inf
+    return t
+
+
+class SphereBVH:
+    def __init__(self, centers, radii, leaf_size=4):
+        self.centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+        self.radii = np.asarray(radii, dtype=float).reshape(-1)
+        self.leaf_size = leaf_size
+        self._build()
+
+    def _build(self):
+        # разбиение по медиане вдоль самой длинной оси центров; узлы в
+        # массивах: границы lo/hi, дети left/right (-1 у листа), диапазон
+        # start:start+count в перестановке order
+        lo_s = self.centers - self.radii[:, None]
+        hi_s = self.centers + self.radii[:, None]
+        order = np.arange(len(self.radii))
+        lo, hi, left, right, axes, start, count = [], [], [], [], [], [], []
+        self.depth = 0
+        stack = [(0, len(order), -1, 0, 1)]
+        while stack:
+            s, e, parent, side, level = stack.pop()
+            node = len(lo)
+            self.depth = max(self.depth, level)
+            if parent >= 0:
+                (left if side == 0 else right)[parent] = node
+            idx = order[s:e]
+            lo.append(lo_s[idx].min(axis=0))
+            hi.append(hi_s[idx].max(axis=0))
+            left.append(-1)
+            right.append(-1)
+            axes.append(0)
+            start.append(s)
+            count.append(e - s)
+            if e - s <= self.leaf_size:
+                continue
+            c = self.centers[idx]
+            axis = np.argmax(c.max(axis=0) - c.min(axis=0))
+            mid = (e - s) // 2
+            order[s:e] = idx[np.argpartition(c[:, axis], mid)]
+            axes[node] = axis
+            stack.append((s + mid, e, node, 1, level + 1))
+            stack.append((s, s + mid, node, 0, level + 1))
+        self.order = order
+        self.axis = np.array(axes)
+        self.lo, self.hi = np.array(lo), np.array(hi)
+        self.left, self.right = np.array(left), np.array(right)
+        self.start, self.count = np.array(start), np.array(count)
+
+    def _leaf_pairs(self, rays, nodes):
+        # все пары (луч, сфера листа) для листовых пар (луч, узел)
+        n = self.count[nodes]
+        ray_ids = np.repeat(rays, n)
+        offs = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        return ray_ids, self.order[np.repeat(self.start[nodes], n) + offs]
+
+    def _traverse(self, origins, dirs, on_leaf, limit):
+        # on_leaf(лучи, сферы) обрабатывает пары в листьях, limit() - текущая
+        # дальность по лучам: узлы дальше нее пропускаются
+        with np.errstate(divide='ignore'):
+            inv = 1 / np.where(dirs == 0, 1e-300, dirs)
+        M = len(origins)
+        # на каждом уровне в стек кладется не больше одного отложенного узла
+        stack = np.zeros((M, self.depth + 1), dtype=int)
+        sp = np.ones(M, dtype=int)
+        active = np.arange(M)
+        while len(active):
+            sp[active] -= 1
+            nodes = stack[active, sp[active]]
+            o, iv = origins[active], inv[active]
+            t0 = (self.lo[nodes] - o) * iv
+            t1 = (self.hi[nodes] - o) * iv
+            tmin = np.minimum(t0, t1).max(axis=1)
+            tmax = np.maximum(t0, t1).min(axis=1)
+            keep = (tmax >= np.maximum(tmin, 0)) & (tmin <= limit()[active])
+            rays, nodes = active[keep], nodes[keep]
+            leaf = self.left[nodes] < 0
+            if leaf.any():
+                on_leaf(*self._leaf_pairs(rays[leaf], nodes[leaf]))
+            rays, nodes = rays[~leaf], nodes[~leaf]
+            # ближний по направлению луча потомок - на вершину стека
+            forward = dirs[rays, self.axis[nodes]] > 0
+            near = np.where(forward, self.left[nodes], self.right[nodes])
+            far = np.where(forward, self.right[nodes], self.left[nodes])
+            stack[rays, sp[rays]] = far
+            stack[rays, sp[rays] + 1] = near
+            sp[rays] += 2
+            active = active[sp[active] > 0]
+
+    def nearest(self, origins, dirs, kernel=None):
+        # ближайшее пересечение: (t, индекс сферы), -1 если луч ничего не задел.
+        # kernel(лучи, сферы) -> t для пар, по умолчанию ray_sphere_t
+        origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+        dirs = np.asarray(dirs, dtype=float).reshape(-1, 3)
+        if kernel is None:
+            kernel = lambda r, s: ray_sphere_t(origins[r], dirs[r], self.centers[s], self.radii[s])
+        t_best = np.full(len(origins), np.inf)
+        sid = np.full(len(origins), -1)
+
+        def on_leaf(r, s):
+            t = kernel(r, s)
+            # при равных t побеждает сфера с меньшим номером, как в argmin
+            better = (t < t_best[r]) | ((t == t_best[r]) & (s < sid[r]) & np.isfinite(t))
+            r, s, t = r[better], s[better], t[better]
+            if len(r) == 0:
+                return
+            order = np.lexsort((s, t, r))
+            r, s, t = r[order], s[order], t[order]
+            first = np.r_[True, r[1:] != r[:-1]]
+            t_best[r[first]] = t[first]
+            sid[r[first]] = s[first]
+
+        self._traverse(origins, dirs, on_leaf, lambda: t_best)
+        return t_best, sid
+
+    def occluded(self, origins, dirs, exclude=None):
+        # маска лучей, которые пересекают хотя бы одну сферу (кроме exclude[m])
+        origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+        dirs = np.asarray(dirs, dtype=float).reshape(-1, 3)
+        blocked = np.zeros(len(origins), dtype=bool)
+        # лучи, уже признанные перекрытыми, дальше не обходятся
+        limit = np.full(len(origins), np.inf)
+
+        def on_leaf(r, s):
+            hit = np.isfinite(ray_sphere_t(origins[r], dirs[r], self.centers[s], self.radii[s]))
+            if exclude is not None:
+                hit &= s != exclude[r]
+            blocked[r[hit]] = True
+            limit[r[hit]] = -np.inf
+
+        self._traverse(origins, dirs, on_leaf, lambda: limit)
+        return blocked
@@ -0,0 +1,202 @@
+# Пакетный рендер анимации ЛР-5 по ключевым кадрам:
+# python animate.py anim.json [-o каталог | --apng файл.png] [-j процессы]
+#
+# anim.json: {"scene": "scene.json", "frames": 360, "fps": 30,
+#             "view": 0 | "camera": {...} | "turntable": {...},
+#             "resolution": 400 (для вида) | "size": [640, 480] (для камеры),
+#             "keys": [{"frame": 0, "lights": [...], "zO": 1500, "camera": {...}}, ...]}
+# Между ключами параметры интерполируются линейно, отсутствующие в ключе
+# берутся из предыдущего ключа (для первого - из сцены). turntable -
+# камера по окружности {"center", "radius", "height", "turns"} вокруг центра.
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from common.apng import ApngWriter
+from raytrace import Scene, gbuffer, observer_position, shade_gbuffer, view_grid, view_index, visible_surface
+from camera import Camera, camera_buffers
+
+
+def _lerp(a, b, w):
+    if isinstance(a, dict):
+        return {k: _lerp(a[k], b[k], w) for k in a}
+    if isinstance(a, list):
+        return [_lerp(x, y, w) for x, y in zip(a, b)]
+    return (1 - w) * np.asarray(a, dtype=float) + w * np.asarray(b, dtype=float)
+
+
+def key_states(scene, spec):
+    # полные состояния ключей: (кадр, состояние) по возрастанию кадра.
+    # Число источников во всех кадрах одно (у ключа - не больше, чем в сцене),
+    # камера, если она есть хоть в одном ключе, задается с первого кадра
+    d = scene.to_dict()
+    state = {"lights": d["lights"], "zO": d["zO"], "kd": d["kd"], "ks": d["ks"], "n": d["n"]}
+    if "camera" in spec:
+        state["camera"] = Camera.from_dict(spec["camera"]).to_dict()
+    keys = []
+    for key in sorted(spec.get("keys", [{"frame": 0}]), key=lambda k: k["frame"]):
+        state = dict(state)
+        for name in ("zO", "kd", "ks", "n"):
+            if name in key:
+                state[name] = float(key[name])
+        if "lights" in key:
+            if len(key["lights"]) > len(state["lights"]):
+                raise ValueError(f"кадр {key['frame']}: источников {len(key['lights'])}, "
+                                 f"в сцене {len(state['lights'])}; число источников менять нельзя")
+            # у источника можно задать только часть полей, не указанные
+            # источники остаются как были
+            state["lights"] = [{**Lold, **L} for Lold, L in zip(state["lights"], key["lights"])] + \
+                              state["lights"][len(key["lights"]):]
+        if "camera" in key:
+            if "camera" not in state and keys:
+                raise ValueError(f"кадр {key['frame']}: камера должна быть задана с первого ключа")
+            state["camera"] = Camera.from_dict({**state.get("camera", {}), **key["camera"]}).to_dict()
+        keys.append((key["frame"], state))
+    return keys
+
+
+def frame_state(keys, frame):
+    if frame <= keys[0][0]:
+        return keys[0][1]
+    for (f0, s0), (f1, s1) in zip(keys, keys[1:]):
+        if frame <= f1:
+            return _lerp(s0, s1, (frame - f0) / (f1 - f0)) if f1 > f0 else s1
+    return keys[-1][1]
+
+
+def turntable_camera(turntable, frame, frames, fov=60):
+    # камера на окружности вокруг center в плоскости XZ, смотрит в центр
+    center = np.asarray(turntable.get("center", (0, 0, 0)), dtype=float)
+    angle = 2 * np.pi * turntable.get("turns", 1) * frame / frames
+    offset = np.array([np.sin(angle), 0, np.cos(angle)]) * turntable["radius"]
+    offset[1] = turntable.get("height", 0)
+    return Camera(center + offset, center, turntable.get("up", (0, 1, 0)), turntable.get("fov", fov))
+
+
+def frame_plan(scene, spec):
+    # состояния всех кадров; у каждого своя камера или None (ортогональный вид)
+    keys = key_states(scene, spec)
+    frames = int(spec["frames"])
+    plan = []
+    for k in range(frames):
+        state = dict(frame_state(keys, k))
+        if "turntable" in spec:
+            state["camera"] = turntable_camera(spec["turntable"], k, frames).to_dict()
+        plan.append(state)
+    return plan
+
+
+def frame_scene(scene, state):
+    # сцена кадра: геометрия (и BVH) общая, источники и материал - из состояния
+    lights = Scene.from_dict({"spheres": [], "lights": state["lights"]}).lights
+    return scene.with_lighting(lights, state["kd"], state["ks"], state["n"], state["zO"])
+
+
+def geometry_key(state):
+    # кадры с одинаковым ключом используют одни буферы видимости
+    camera = state.get("camera")
+    return None if camera is None else json.dumps(camera, default=lambda v: np.asarray(v).tolist(),
+                                                  sort_keys=True)
+
+
+def frame_buffers(scene, spec, state):
+    if state.get("camera") is not None:
+        size = spec.get("size", (640, 480))
+        return camera_buffers(scene, Camera.from_dict(state["camera"]), *size)
+    view = view_index(spec.get("view", 0))
+    X, Y = np.meshgrid(*view_grid(scene, view, spec.get("resolution", 400)))
+    sphere_ids, points = visible_surface(scene, view, X, Y, zbuffer=True)
+    return gbuffer(scene, view, sphere_ids.reshape(X.shape), points.reshape(X.shape + (3,)))
+
+
+def render_frame_raw(scene, spec, state, buffers):
+    frame = frame_scene(scene, state)
+    if state.get("camera") is not None:
+        eye = np.asarray(state["camera"]["position"], dtype=float)
+    else:
+        eye = observer_position(frame, spec.get("view", 0))
+    return shade_gbuffer(frame, buffers, eye)
+
+
+def expose(raw, exposure):
+    # общая для всех кадров нормировка: иначе яркость "дышит" от кадра к кадру
+    return (np.clip(raw / exposure, 0, 1) * 255).astype(np.uint8)
+
+
+def _frames_job(job):
+    # подряд идущие кадры; буферы видимости переиспользуются, пока не
+    # изменилась геометрия кадра (камера)
+    scene, spec, states, exposure = job
+    images, key, buffers = [], object(), None
+    for state in states:
+        if geometry_key(state) != key:
+            key, buffers = geometry_key(state), frame_buffers(scene, spec, state)
+        images.append(expose(render_frame_raw(scene, spec, state, buffers), exposure))
+    return images
+
+
+def iter_frames(scene, spec, workers=1, chunk=8):
+    # кадры по порядку; одновременно в работе не больше 2 * workers пачек
+    plan = frame_plan(scene, spec)
+    scene.accel()
+    exposure = spec.get("exposure")
+    if exposure is None:
+        # по первому кадру; более яркие кадры ограничиваются сверху
+        exposure = np.max(render_frame_raw(scene, spec, plan[0], frame_buffers(scene, spec, plan[0]))) or 1
+    jobs = [(scene, spec, plan[k:k + chunk], exposure) for k in range(0, len(plan), chunk)]
+    if workers <= 1:
+        for job in jobs:
+            yield from _frames_job(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        for job in jobs:
+            pending.append(ex.submit(_frames_job, job))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def load_spec(path):
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    scene_path = os.path.join(os.path.dirname(os.path.abspath(path)), spec["scene"])
+    return Scene.load(scene_path), spec
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Рендер анимации ЛР-5 по ключевым кадрам")
+    parser.add_argument("anim", help="JSON-файл анимации")
+    parser.add_argument("-o", "--output", default="frames", help="каталог для frame_0000.png ...")
+    parser.add_argument("--apng", default=None, help="записать один анимированный PNG вместо кадров")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="число процессов (1 - без пула)")
+    args = parser.parse_args(argv)
+
+    scene, spec = load_spec(args.anim)
+    frames = iter_frames(scene, spec, args.workers)
+    if args.apng:
+        first = next(frames)
+        with ApngWriter(args.apng, first.shape[1], first.shape[0], int(spec["frames"]),
+                        spec.get("fps", 25)) as writer:
+            writer.add(first)
+            for img in frames:
+                writer.add(img)
+        print(f"{writer.count} кадров: {args.apng}")
+        return
+    os.makedirs(args.output, exist_ok=True)
+    for k, img in enumerate(frames):
+        Image.fromarray(img).save(os.path.join(args.output, f"frame_{k:04d}.png"))
+    print(f"{int(spec['frames'])} кадров: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
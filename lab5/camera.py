@@ -0,0 +1,82 @@
+# Перспективная камера ЛР-5: положение, точка взгляда, вектор "вверх" и
+# вертикальный угол обзора. Первичные лучи всего кадра строятся одним
+# массивом и пересекаются со сценой пакетно (nearest_hit, для больших сцен -
+# через BVH), освещение - тот же отложенный проход, что и у видов.
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from raytrace import _normalize, nearest_hit, shade_gbuffer, to_image
+
+
+@dataclass
+class Camera:
+    position: np.ndarray
+    look_at: np.ndarray = field(default_factory=lambda: np.zeros(3))
+    up: np.ndarray = field(default_factory=lambda: np.array([0.0, 1.0, 0.0]))
+    fov: float = 60  # вертикальный угол обзора, градусы
+
+    def __post_init__(self):
+        self.position = np.asarray(self.position, dtype=float)
+        self.look_at = np.asarray(self.look_at, dtype=float)
+        self.up = np.asarray(self.up, dtype=float)
+        self.fov = float(self.fov)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["position"], d.get("look_at", (0, 0, 0)), d.get("up", (0, 1, 0)), d.get("fov", 60))
+
+    def to_dict(self):
+        return {"position": list(map(float, self.position)), "look_at": list(map(float, self.look_at)),
+                "up": list(map(float, self.up)), "fov": self.fov}
+
+    def basis(self):
+        # направление взгляда, вправо и вверх по экрану (ортонормированные)
+        forward = self.look_at - self.position
+        right = np.cross(forward, self.up)
+        if np.linalg.norm(forward) == 0 or np.linalg.norm(right) == 0:
+            raise ValueError("камера: точка взгляда совпадает с положением или up параллелен взгляду")
+        forward, right = _normalize(forward), _normalize(right)
+        return forward, right, np.cross(right, forward)
+
+    def primary_rays(self, width, height):
+        # (начала, направления) лучей через центры всех пикселей кадра,
+        # (height * width, 3), строка 0 - верх кадра
+        forward, right, up = self.basis()
+        half_h = np.tan(np.radians(self.fov) / 2)
+        half_w = half_h * width / height
+        u = ((np.arange(width) + 0.5) / width * 2 - 1) * half_w
+        v = (1 - (np.arange(height) + 0.5) / height * 2) * half_h
+        dirs = forward + u[None, :, None] * right + v[:, None, None] * up
+        dirs = _normalize(dirs.reshape(-1, 3))
+        return np.broadcast_to(self.position, dirs.shape), dirs
+
+
+def camera_buffers(scene, camera, width=640, height=480):
+    # G-буфер кадра камеры: номера сфер (-1 - фон), точки, нормали, альбедо
+    # и расстояние вдоль луча (np.inf - фон), все формы (height, width, ...)
+    origins, dirs = camera.primary_rays(width, height)
+    centers = np.array([s["C"] for s in scene.spheres], dtype=float).reshape(-1, 3)
+    radii = np.array([s["R"] for s in scene.spheres], dtype=float)
+    colors = np.array([s["col"] for s in scene.spheres], dtype=float).reshape(-1, 3)
+    t, sid = nearest_hit(origins, dirs, centers, radii, bvh=scene.accel())
+
+    hit = sid >= 0
+    points = np.zeros(dirs.shape)
+    points[hit] = origins[hit] + t[hit, None] * dirs[hit]
+    normals = np.zeros(dirs.shape)
+    normals[hit] = _normalize(points[hit] - centers[sid[hit]])
+    albedo = np.where(hit[:, None], colors[sid], 0)
+    shape = (height, width)
+    return {"sphere_ids": sid.reshape(shape), "points": points.reshape(shape + (3,)),
+            "normals": normals.reshape(shape + (3,)), "albedo": albedo.reshape(shape + (3,)),
+            "depth": t.reshape(shape)}
+
+
+def render_camera_raw(scene, camera, width=640, height=480):
+    # ненормированная яркость кадра (height, width, 3)
+    return shade_gbuffer(scene, camera_buffers(scene, camera, width, height), camera.position)
+
+
+def render_camera(scene, camera, width=640, height=480):
+    return to_image(render_camera_raw(scene, camera, width, height))
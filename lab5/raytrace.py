@@ -0,0 +1,694 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+from common.antialias import edge_mask, stratified_offsets, supersample
+from common.progressive import STEPS, level_masks, upsample
+from accel import SphereBVH
+
+# со скольких сфер видимость и тени считаются через BVH (lab5/accel.py);
+# для маленьких сцен прямой перебор быстрее построения иерархии
+ACCEL_MIN_SPHERES = 32
+
+
+def compute_resolution(W_mm, H_mm, base_res=400):
+    aspect = W_mm / H_mm
+    Hres = base_res
+    Wres = int(base_res * aspect)
+    return Wres, Hres
+
+
+def intersect_sphere(P, L, center, R):
+    oc = P - center
+    a = np.dot(L, L)
+    b = 2 * np.dot(oc, L)
+    c = np.dot(oc, oc) - R * R
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return False
+    t1 = (-b - np.sqrt(disc)) / (2 * a)
+    t2 = (-b + np.sqrt(disc)) / (2 * a)
+    return (t1 > 1e-3) or (t2 > 1e-3)
+
+
+def intersect_spheres(origins, dirs, centers, radii, eps=1e-3):
+    # пакетный вариант intersect_sphere: лучи (M, 3) x сферы (S, 3)
+    # возвращает ближайшее t > eps для каждой пары (M, S), np.inf - нет пересечения
+    origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+    dirs = np.asarray(dirs, dtype=float).reshape(-1, 3)
+    centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=float).reshape(-1)
+    oc = origins[:, None, :] - centers[None, :, :]
+    a = np.sum(dirs * dirs, axis=1)[:, None]
+    b = 2 * np.einsum('msk,mk->ms', oc, dirs)
+    c = np.einsum('msk,msk->ms', oc, oc) - radii * radii
+    disc = b * b - 4 * a * c
+    hit = disc >= 0
+    sq = np.sqrt(np.where(hit, disc, 0))
+    t1 = (-b - sq) / (2 * a)
+    t2 = (-b + sq) / (2 * a)
+    t = np.where(t1 > eps, t1, np.where(t2 > eps, t2, np.inf))
+    t[~hit] = np.inf
+    return t
+
+
+def shadow_rays(origins, dirs, centers, radii, exclude=None, chunk=65536, bvh=None):
+    # маска лучей, перекрытых хотя бы одной сферой (кроме exclude[m]);
+    # bvh (SphereBVH тех же сфер) - обход иерархии вместо перебора всех сфер
+    origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+    dirs = np.asarray(dirs, dtype=float).reshape(-1, 3)
+    blocked = np.zeros(len(origins), dtype=bool)
+    for k in range(0, len(origins), chunk):
+        if bvh is not None:
+            ex = None if exclude is None else np.asarray(exclude)[k:k + chunk]
+            blocked[k:k + chunk] = bvh.occluded(origins[k:k + chunk], dirs[k:k + chunk], ex)
+            continue
+        t = intersect_spheres(origins[k:k + chunk], dirs[k:k + chunk], centers, radii)
+        hit = np.isfinite(t)
+        if exclude is not None:
+            ex = np.asarray(exclude)[k:k + chunk]
+            hit[np.arange(len(ex)), ex] = False
+        blocked[k:k + chunk] = hit.any(axis=1)
+    return blocked
+
+
+def nearest_hit(origins, dirs, centers, radii, chunk=65536, bvh=None):
+    # ближайшее пересечение: (t, индекс сферы), -1 если луч ничего не задел
+    origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+    dirs = np.asarray(dirs, dtype=float).reshape(-1, 3)
+    t_best = np.full(len(origins), np.inf)
+    sid = np.full(len(origins), -1)
+    for k in range(0, len(origins), chunk):
+        if bvh is not None:
+            t_best[k:k + chunk], sid[k:k + chunk] = bvh.nearest(origins[k:k + chunk], dirs[k:k + chunk])
+            continue
+        t = intersect_spheres(origins[k:k + chunk], dirs[k:k + chunk], centers, radii)
+        if t.shape[1] == 0:
+            continue
+        j = np.argmin(t, axis=1)
+        tj = t[np.arange(len(j)), j]
+        found = np.isfinite(tj)
+        t_best[k:k + chunk] = tj
+        sid[k:k + chunk] = np.where(found, j, -1)
+    return t_best, sid
+
+
+def _normalize(v):
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+@dataclass
+class Scene:
+    # сферы: {"C": центр, "R": радиус, "col": цвет}; источники: {"pos", "I0", "col"}
+    spheres: list = field(default_factory=list)
+    lights: list = field(default_factory=list)
+    kd: float = 0.7
+    ks: float = 0.5
+    n: float = 50
+    zO: float = 1500
+
+    @classmethod
+    def from_dict(cls, d):
+        spheres = [{"C": np.array(s["C"], dtype=float), "R": float(s["R"]),
+                    "col": np.array(s["col"], dtype=float)} for s in d["spheres"]]
+        lights = [{"pos": np.array(L["pos"], dtype=float), "I0": float(L["I0"]),
+                   "col": np.array(L.get("col", (1, 1, 1)), dtype=float)} for L in d["lights"]]
+        return cls(spheres, lights, float(d.get("kd", 0.7)), float(d.get("ks", 0.5)),
+                   float(d.get("n", 50)), float(d.get("zO", 1500)))
+
+    def to_dict(self):
+        return {
+            "spheres": [{"C": list(map(float, s["C"])), "R": float(s["R"]),
+                         "col": list(map(float, s["col"]))} for s in self.spheres],
+            "lights": [{"pos": list(map(float, L["pos"])), "I0": float(L["I0"]),
+                        "col": list(map(float, L["col"]))} for L in self.lights],
+            "kd": self.kd, "ks": self.ks, "n": self.n, "zO": self.zO,
+        }
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def accel(self):
+        # BVH сфер для сцен от ACCEL_MIN_SPHERES сфер, иначе None. Строится
+        # один раз и передается в процессы вместе со сценой, поэтому после
+        # первого вызова центры и радиусы сфер менять нельзя (цвета - можно)
+        if len(self.spheres) < ACCEL_MIN_SPHERES:
+            return None
+        if getattr(self, "_bvh", None) is None:
+            self._bvh = SphereBVH([s["C"] for s in self.spheres], [s["R"] for s in self.spheres])
+        return self._bvh
+
+    def with_lighting(self, lights, kd, ks, n, zO):
+        # копия с другими источниками, материалом и наблюдателем; сферы и
+        # построенный BVH общие с исходной сценой
+        other = replace(self, lights=lights, kd=float(kd), ks=float(ks), n=float(n), zO=float(zO))
+        other._bvh = getattr(self, "_bvh", None)
+        return other
+
+
+# имя вида, оси плоскости изображения (a, b) и ось глубины (к наблюдателю)
+VIEWS = [
+    ("Вид XY (Z)", 0, 1, 2),
+    ("Вид XZ (Y)", 0, 2, 1),
+    ("Вид YZ (X)", 1, 2, 0),
+]
+
+
+def view_index(view):
+    if isinstance(view, str):
+        for idx, (name, _, _, _) in enumerate(VIEWS):
+            if view in (name, name.split()[1]):
+                return idx
+        raise ValueError(f"неизвестный вид: {view}")
+    return int(view)
+
+
+def result_filename(view):
+    name = VIEWS[view_index(view)][0]
+    return f"lab5_result_{name.replace(' ', '_').replace('(', '').replace(')', '')}.png"
+
+
+def observer_position(scene, view):
+    O = np.zeros(3)
+    O[VIEWS[view_index(view)][3]] = scene.zO
+    return O
+
+
+def view_grid(scene, view, resolution=400):
+    # координаты пикселей вида: рамка вокруг всех сфер с полями 25 мм
+    _, a, b, _ = VIEWS[view_index(view)]
+    xs = [s["C"][a] - s["R"] for s in scene.spheres] + [s["C"][a] + s["R"] for s in scene.spheres]
+    ys = [s["C"][b] - s["R"] for s in scene.spheres] + [s["C"][b] + s["R"] for s in scene.spheres]
+
+    Wmm = max(xs) - min(xs) + 50
+    Hmm = max(ys) - min(ys) + 50
+    Wres, Hres = compute_resolution(Wmm, Hmm, resolution)
+    return (np.linspace(min(xs) - 25, max(xs) + 25, Wres),
+            np.linspace(min(ys) - 25, max(ys) + 25, Hres))
+
+
+def visible_surface(scene, view, px, py, zbuffer=False):
+    # видимость в пикселях px, py плоскости изображения вида: номер
+    # ближайшей к наблюдателю сферы (-1 - фон) и точка на ней, (n,) и (n, 3).
+    # zbuffer=True - растеризация с z-буфером (rasterize_surface), результат тот же
+    if zbuffer:
+        return rasterize_surface(scene, view, px, py)
+    _, a, b, d = VIEWS[view_index(view)]
+    spheres = scene.spheres
+
+    px = np.asarray(px, dtype=float).reshape(-1)
+    py = np.asarray(py, dtype=float).reshape(-1)
+    bvh = scene.accel()
+    if bvh is not None:
+        return _visible_surface_bvh(bvh, a, b, d, px, py)
+    sphere_ids = np.full(len(px), -1)
+    points = np.zeros((len(px), 3))
+
+    # видимость: ближайшая к наблюдателю сфера в каждом пикселе
+    for m in range(len(px)):
+        best_depth = -np.inf
+        best_sphere = -1
+        best_P = None
+        for k, s in enumerate(spheres):
+            dx, dy = px[m] - s["C"][a], py[m] - s["C"][b]
+            if dx * dx + dy * dy <= s["R"] ** 2:
+                dz = np.sqrt(s["R"] ** 2 - dx * dx - dy * dy)
+                depth = s["C"][d] + dz
+                if depth > best_depth:
+                    best_depth = depth
+                    best_sphere = k
+                    best_P = np.empty(3)
+                    best_P[a], best_P[b], best_P[d] = px[m], py[m], depth
+        if best_sphere < 0:
+            continue
+        sphere_ids[m] = best_sphere
+        points[m] = best_P
+    return sphere_ids, points
+
+
+def _visible_surface_bvh(bvh, a, b, d, px, py):
+    # то же через BVH: из пикселей выпускаются лучи против оси наблюдения с
+    # плоскости top позади всех сфер (со стороны наблюдателя), t = top - глубина.
+    # Попадание и глубина считаются той же формулой, что и в цикле
+    centers, radii = bvh.centers, bvh.radii
+    top = (centers[:, d] + radii).max() + 1
+    origins = np.zeros((len(px), 3))
+    origins[:, a], origins[:, b], origins[:, d] = px, py, top
+    dirs = np.zeros((len(px), 3))
+    dirs[:, d] = -1
+
+    def depth(r, s):
+        dx, dy = px[r] - centers[s, a], py[r] - centers[s, b]
+        R2 = radii[s] ** 2
+        inside = dx * dx + dy * dy <= R2
+        return np.where(inside, centers[s, d] + np.sqrt(np.where(inside, R2 - dx * dx - dy * dy, 0)), -np.inf)
+
+    _, sphere_ids = bvh.nearest(origins, dirs, kernel=lambda r, s: top - depth(r, s))
+    hit = np.flatnonzero(sphere_ids >= 0)
+    points = np.zeros((len(px), 3))
+    points[:, a], points[:, b] = px, py
+    points[hit, d] = depth(hit, sphere_ids[hit])
+    points[sphere_ids < 0] = 0
+    return sphere_ids, points
+
+
+def rasterize_surface(scene, view, px, py):
+    # видимость растеризацией: пиксели раскладываются по решетке из их
+    # различных координат, каждая сфера обрабатывается только в своем
+    # прямоугольнике на экране, ближайшая сфера выбирается сравнением с
+    # z-буфером. Работа растет с площадью сфер на экране, а не как
+    # пиксели x сферы. Формулы и порядок сфер - как в visible_surface
+    _, a, b, d = VIEWS[view_index(view)]
+    px = np.asarray(px, dtype=float).reshape(-1)
+    py = np.asarray(py, dtype=float).reshape(-1)
+    xs, cols = np.unique(px, return_inverse=True)
+    ys, rows = np.unique(py, return_inverse=True)
+    if len(xs) * len(ys) > 2 * len(px):
+        # разрозненные точки (выборки сглаживания): решетка из их координат
+        # была бы почти полной решеткой выборок, глубина проверяется по точкам
+        return _rasterize_points(scene, a, b, d, px, py)
+    zbuf = np.full((len(ys), len(xs)), -np.inf)
+    ids = np.full(zbuf.shape, -1)
+
+    for k, s in enumerate(scene.spheres):
+        C, R = s["C"], s["R"]
+        # прямоугольник с запасом в пиксель: попадание решает точная проверка
+        c0 = max(np.searchsorted(xs, C[a] - R) - 1, 0)
+        c1 = np.searchsorted(xs, C[a] + R, side="right") + 1
+        r0 = max(np.searchsorted(ys, C[b] - R) - 1, 0)
+        r1 = np.searchsorted(ys, C[b] + R, side="right") + 1
+        dx = xs[c0:c1] - C[a]
+        dy = ys[r0:r1, None] - C[b]
+        inside = dx * dx + dy * dy <= R ** 2
+        if not inside.any():
+            continue
+        depth = C[d] + np.sqrt(np.where(inside, R ** 2 - dx * dx - dy * dy, 0))
+        closer = inside & (depth > zbuf[r0:r1, c0:c1])
+        zbuf[r0:r1, c0:c1][closer] = depth[closer]
+        ids[r0:r1, c0:c1][closer] = k
+
+    sphere_ids = ids[rows, cols]
+    points = np.zeros((len(px), 3))
+    hit = sphere_ids >= 0
+    points[hit, a], points[hit, b] = px[hit], py[hit]
+    points[hit, d] = zbuf[rows[hit], cols[hit]]
+    return sphere_ids, points
+
+
+def _rasterize_points(scene, a, b, d, px, py):
+    # z-буфер по самим точкам: точки отсортированы по x, сфера проверяется
+    # только в попавшей в ее проекцию полосе; формулы - как в rasterize_surface
+    order = np.argsort(px, kind="stable")
+    xs = px[order]
+    zbuf = np.full(len(px), -np.inf)
+    sphere_ids = np.full(len(px), -1)
+    for k, s in enumerate(scene.spheres):
+        C, R = s["C"], s["R"]
+        m = order[np.searchsorted(xs, C[a] - R):np.searchsorted(xs, C[a] + R, side="right")]
+        dx = px[m] - C[a]
+        dy = py[m] - C[b]
+        inside = dx * dx + dy * dy <= R ** 2
+        m, dx, dy = m[inside], dx[inside], dy[inside]
+        depth = C[d] + np.sqrt(R ** 2 - dx * dx - dy * dy)
+        closer = depth > zbuf[m]
+        zbuf[m[closer]] = depth[closer]
+        sphere_ids[m[closer]] = k
+
+    points = np.zeros((len(px), 3))
+    hit = sphere_ids >= 0
+    points[hit, a], points[hit, b] = px[hit], py[hit]
+    points[hit, d] = zbuf[hit]
+    return sphere_ids, points
+
+
+def light_visibility(scene, sphere_ids, points):
+    # маски освещенности (..., источники): True - точка видимой поверхности
+    # не в тени источника, у фона - False. Считаются один раз и идут и в
+    # освещение (lit=), и в поиск границ теней при сглаживании
+    hit = sphere_ids >= 0
+    P, sid = points[hit], sphere_ids[hit]
+    centers = np.array([s["C"] for s in scene.spheres], dtype=float)
+    radii = np.array([s["R"] for s in scene.spheres], dtype=float)
+    lit = np.zeros(sphere_ids.shape + (len(scene.lights),), dtype=bool)
+    for k, L in enumerate(scene.lights):
+        lit[hit, k] = ~shadow_rays(P, _normalize(L["pos"] - P), centers, radii, exclude=sid, bvh=scene.accel())
+    return lit
+
+
+def shade_surface(scene, view, sphere_ids, points, lit=None):
+    # освещение готовой геометрии: ненормированная яркость (n, 3);
+    # lit - готовые маски light_visibility, иначе тени считаются здесь
+    idx = view_index(view)
+    spheres, lights = scene.spheres, scene.lights
+    kd, ks, n = scene.kd, scene.ks, scene.n
+    O = observer_position(scene, idx)
+    img = np.zeros((len(sphere_ids), 3), dtype=float)
+
+    # тени: все теневые лучи (пиксели x источники) одним пакетом
+    hits = np.nonzero(sphere_ids >= 0)[0]
+    P_hit = points[hits]
+    sid_hit = sphere_ids[hits]
+    Lpos = np.array([L["pos"] for L in lights], dtype=float).reshape(-1, 3)
+    Lvec = Lpos[None, :, :] - P_hit[:, None, :]
+    Ldirs = Lvec / np.linalg.norm(Lvec, axis=2, keepdims=True)
+    if lit is not None:
+        shadowed = ~lit[hits]
+    else:
+        centers = np.array([s["C"] for s in spheres], dtype=float)
+        radii = np.array([s["R"] for s in spheres], dtype=float)
+        shadowed = shadow_rays(np.repeat(P_hit, len(lights), axis=0), Ldirs.reshape(-1, 3),
+                               centers, radii, exclude=np.repeat(sid_hit, len(lights)), bvh=scene.accel())
+        shadowed = shadowed.reshape(len(P_hit), len(lights))
+
+    for k in range(len(P_hit)):
+        C = spheres[sid_hit[k]]["C"]
+        col = spheres[sid_hit[k]]["col"]
+        P = P_hit[k]
+        N = (P - C) / np.linalg.norm(P - C)
+        V = (O - P) / np.linalg.norm(O - P)
+        total = np.zeros(3)
+        for li, L in enumerate(lights):
+            if shadowed[k, li]:
+                continue
+            Ldir = Ldirs[k, li]
+            Hvec = (V + Ldir) / np.linalg.norm(V + Ldir)
+            diff = kd * max(0, np.dot(N, Ldir))
+            if diff > 0:
+                spec = ks * max(0, np.dot(N, Hvec)) ** n
+            else:
+                spec = 0
+            total += L["I0"] * L["col"] * col * (diff + spec)
+
+        img[hits[k]] = total
+
+    return img
+
+
+def surface_buffers(scene, view, sphere_ids, points):
+    # буферы видимости вида для повторного освещения: номера сфер (-1 - фон),
+    # точки поверхности, глубина вдоль оси наблюдения (z-буфер, -inf - фон)
+    # и нормали
+    d = VIEWS[view_index(view)][3]
+    centers = np.array([s["C"] for s in scene.spheres], dtype=float).reshape(-1, 3)
+    hit = sphere_ids >= 0
+    normals = np.zeros(points.shape)
+    normals[hit] = _normalize(points[hit] - centers[sphere_ids[hit]])
+    return {"sphere_ids": sphere_ids, "points": points,
+            "zbuf": np.where(hit, points[..., d], -np.inf), "normals": normals}
+
+
+def gbuffer(scene, view, sphere_ids, points):
+    # G-буфер отложенного освещения: буферы видимости плюс альбедо (цвет
+    # сферы, 0 - фон). Альбедо не кешируется вместе с геометрией: цвет
+    # сфер меняется без пересчета видимости
+    buffers = surface_buffers(scene, view, sphere_ids, points)
+    colors = np.array([s["col"] for s in scene.spheres], dtype=float).reshape(-1, 3)
+    buffers["albedo"] = np.where((sphere_ids >= 0)[..., None], colors[sphere_ids], 0)
+    return buffers
+
+
+def shade_deferred(scene, view, buffers, lit=None):
+    # второй проход: освещение всего G-буфера, по одному векторному проходу
+    # (тени + Блинн-Фонг) на источник. Ненормированная яркость (..., 3)
+    if "albedo" not in buffers:
+        buffers = gbuffer(scene, view, buffers["sphere_ids"], buffers["points"])
+    return shade_gbuffer(scene, buffers, observer_position(scene, view), lit)
+
+
+def shade_gbuffer(scene, buffers, eye, lit=None):
+    # освещение G-буфера (sphere_ids, points, normals, albedo) для
+    # наблюдателя в точке eye; общее для видов и перспективной камеры.
+    # lit - готовые маски light_visibility, иначе тени считаются здесь
+    sphere_ids = buffers["sphere_ids"]
+    hit = sphere_ids >= 0
+    sid = sphere_ids[hit]
+    P, N, albedo = buffers["points"][hit], buffers["normals"][hit], buffers["albedo"][hit]
+    V = _normalize(eye - P)
+    centers = np.array([s["C"] for s in scene.spheres], dtype=float)
+    radii = np.array([s["R"] for s in scene.spheres], dtype=float)
+    kd, ks, n = scene.kd, scene.ks, scene.n
+    bvh = scene.accel()
+
+    total = np.zeros(P.shape)
+    for k, L in enumerate(scene.lights):
+        Ldir = _normalize(L["pos"] - P)
+        if lit is None:
+            visible = ~shadow_rays(P, Ldir, centers, radii, exclude=sid, bvh=bvh)
+        else:
+            visible = lit[hit, k]
+        Hvec = _normalize(V + Ldir)
+        diff = kd * np.maximum(0, np.einsum("mc,mc->m", N, Ldir))
+        spec = np.where(diff > 0, ks * np.maximum(0, np.einsum("mc,mc->m", N, Hvec)) ** n, 0)
+        total += np.where(visible[:, None], L["I0"] * L["col"] * albedo * (diff + spec)[:, None], 0)
+
+    img = np.zeros(sphere_ids.shape + (3,))
+    img[hit] = total
+    return img
+
+
+def shadow_labels(sphere_ids, lit):
+    # метка набора источников, не закрытых тенью (бит на источник, -1 - фон):
+    # ее смена между соседними пикселями - граница тени. lit - light_visibility
+    hit = sphere_ids >= 0
+    labels = np.full(sphere_ids.shape, -1, dtype=np.int64)
+    labels[hit] = 0
+    for k in range(lit.shape[-1]):
+        labels[hit] ^= lit[hit, k].astype(np.int64) << (k % 62)
+    return labels
+
+
+def pixel_step(scene, view, resolution=400):
+    # шаг пикселя вида по осям изображения (по всей решетке, а не по полосе);
+    # вдоль оси из одного пикселя - 0, выборки по ней не разносятся
+    x, y = view_grid(scene, view, resolution)
+    return tuple((v[-1] - v[0]) / (len(v) - 1) if len(v) > 1 else 0.0 for v in (x, y))
+
+
+def antialias_view(scene, view, raw, buffers, X, Y, step, samples=2, deferred=False, zbuffer=False,
+                   jitter=True, lit=None):
+    # адаптивное сглаживание ненормированного изображения вида (common.antialias):
+    # пиксели на границах сфер (смена номера сферы) и теней пересчитываются
+    # по samples x samples выборкам. X, Y - координаты пикселей, buffers -
+    # буферы видимости тех же пикселей (sphere_ids, points), step - pixel_step,
+    # lit - маски теней основного прохода (иначе считаются заново)
+    if step[0] == 0 and step[1] == 0:
+        return raw
+    sphere_ids = buffers["sphere_ids"]
+    if lit is None:
+        lit = light_visibility(scene, sphere_ids, buffers["points"])
+    edges = edge_mask(sphere_ids, shadow_labels(sphere_ids, lit))
+    result = raw.copy()
+    result[edges] = supersample(lambda px, py: render_samples(scene, view, px, py, deferred, zbuffer),
+                                X[edges], Y[edges], *step, stratified_offsets(samples, jitter))
+    return result
+
+
+def render_samples(scene, view, px, py, deferred=False, zbuffer=False):
+    # ненормированная яркость (n, 3) в произвольных пикселях вида;
+    # deferred=True - освещение через G-буфер (shade_deferred),
+    # zbuffer=True - видимость растеризацией (rasterize_surface)
+    sphere_ids, points = visible_surface(scene, view, px, py, zbuffer)
+    if deferred:
+        return shade_deferred(scene, view, gbuffer(scene, view, sphere_ids, points))
+    return shade_surface(scene, view, sphere_ids, points)
+
+
+def render_rows(scene, view, resolution=400, row0=0, row1=None, deferred=False, zbuffer=False, aa=1):
+    # ненормированные строки row0..row1 изображения вида (rows, Wres, 3);
+    # aa > 1 - сглаживание границ (antialias_view) по aa x aa выборкам
+    x, y = view_grid(scene, view, resolution)
+    if aa <= 1:
+        X, Y = np.meshgrid(x, y[row0:row1])
+        return render_samples(scene, view, X, Y, deferred, zbuffer).reshape(X.shape + (3,))
+    # границы ищутся с соседними строками соседних полос
+    row1 = len(y) if row1 is None else row1
+    r0, r1 = max(row0 - 1, 0), min(row1 + 1, len(y))
+    X, Y = np.meshgrid(x, y[r0:r1])
+    sphere_ids, points = visible_surface(scene, view, X, Y, zbuffer)
+    buffers = {"sphere_ids": sphere_ids.reshape(X.shape), "points": points.reshape(X.shape + (3,))}
+    # тени основного прохода нужны и освещению, и поиску границ
+    lit = light_visibility(scene, buffers["sphere_ids"], buffers["points"])
+    if deferred:
+        raw = shade_deferred(scene, view, gbuffer(scene, view, buffers["sphere_ids"], buffers["points"]), lit)
+    else:
+        raw = shade_surface(scene, view, sphere_ids, points, lit.reshape(len(sphere_ids), lit.shape[-1]))
+        raw = raw.reshape(X.shape + (3,))
+    raw = antialias_view(scene, view, raw, buffers, X, Y, pixel_step(scene, view, resolution), aa,
+                         deferred, zbuffer, lit=lit)
+    return raw[row0 - r0:row1 - r0]
+
+
+def to_image(img):
+    maxv = np.max(img)
+    if maxv > 0:
+        return (img / maxv * 255).astype(np.uint8)
+    return img.astype(np.uint8)
+
+
+def _render_job(job):
+    scene, view, resolution, row0, row1, deferred, zbuffer, aa = job
+    return render_rows(scene, view, resolution, row0, row1, deferred, zbuffer, aa)
+
+
+def render_views(scene, views=(0, 1, 2), resolution=400, workers=1, tiles=None, deferred=False,
+                 zbuffer=False, aa=1):
+    # виды независимы, а строки одного вида - тоже: режем каждый вид на
+    # горизонтальные полосы и раздаем их процессам; результат совпадает с
+    # последовательным рендером
+    views = [view_index(v) for v in views]
+    scene.accel()  # BVH строится до раздачи задач, а не в каждом процессе
+    if tiles is None:
+        tiles = 1 if workers <= 1 else -(-2 * workers // len(views))
+    jobs, counts = [], []
+    for v in views:
+        Hres = len(view_grid(scene, v, resolution)[1])
+        bounds = np.linspace(0, Hres, min(tiles, Hres) + 1).astype(int)
+        counts.append(len(bounds) - 1)
+        jobs += [(scene, v, resolution, r0, r1, deferred, zbuffer, aa) for r0, r1 in zip(bounds[:-1], bounds[1:])]
+
+    if workers <= 1:
+        parts = list(map(_render_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as ex:
+            parts = list(ex.map(_render_job, jobs))
+
+    images = []
+    for k in counts:
+        images.append(to_image(np.concatenate(parts[:k], axis=0)))
+        parts = parts[k:]
+    return images
+
+
+def relight(scene, view, buffers, deferred=False, lit=None):
+    # ненормированное изображение вида по готовым буферам видимости
+    if deferred:
+        return shade_deferred(scene, view, buffers, lit)
+    sphere_ids = buffers["sphere_ids"]
+    if lit is not None:
+        lit = lit.reshape(sphere_ids.size, lit.shape[-1])
+    img = shade_surface(scene, view, sphere_ids.reshape(-1), buffers["points"].reshape(-1, 3), lit)
+    return img.reshape(sphere_ids.shape + (3,))
+
+
+def _samples_job(job):
+    # (номера сфер, точки, яркость, маски теней light_visibility)
+    scene, view, px, py, deferred, zbuffer = job
+    sphere_ids, points = visible_surface(scene, view, px, py, zbuffer)
+    lit = light_visibility(scene, sphere_ids, points)
+    if deferred:
+        return sphere_ids, points, shade_deferred(scene, view, gbuffer(scene, view, sphere_ids, points), lit), lit
+    return sphere_ids, points, shade_surface(scene, view, sphere_ids, points, lit), lit
+
+
+def render_views_progressive(scene, views=(0, 1, 2), resolution=400, steps=STEPS, workers=1,
+                             on_level=None, cancel=None, keep_buffers=False, deferred=False, zbuffer=False,
+                             aa=1):
+    # виды уровнями 1/8, 1/4, 1/2, 1 (см. common.progressive): на каждом
+    # уровне досчитываются только новые пиксели всех видов, on_level(step,
+    # превью) получает изображения уровня, увеличенные до полного размера.
+    # Итог совпадает с render_views; при отмене (cancel.is_set()) - None.
+    # keep_buffers=True - вернуть еще и буферы видимости (surface_buffers).
+    # aa > 1 - после полного уровня сглаживаются границы (antialias_view)
+    views = [view_index(v) for v in views]
+    scene.accel()
+    grids = [np.meshgrid(*view_grid(scene, v, resolution)) for v in views]
+    raw = [np.zeros(X.shape + (3,)) for X, _ in grids]
+    ids = [np.full(X.shape, -1) for X, _ in grids]
+    points = [np.zeros(X.shape + (3,)) for X, _ in grids]
+    lits = [np.zeros(X.shape + (len(scene.lights),), dtype=bool) for X, _ in grids]
+    levels = zip(*[level_masks(*X.shape, steps) for X, _ in grids])
+    ex = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for level in levels:
+            if cancel is not None and cancel.is_set():
+                return None
+            jobs, targets = [], []
+            for k, (v, (X, Y), (step, mask)) in enumerate(zip(views, grids, level)):
+                idx = np.flatnonzero(mask)
+                for part in np.array_split(idx, max(1, min(len(idx), -(-2 * workers // len(views))))):
+                    jobs.append((scene, v, X.flat[part], Y.flat[part], deferred, zbuffer))
+                    targets.append((k, part))
+            parts = ex.map(_samples_job, jobs) if ex else map(_samples_job, jobs)
+            for (k, part), (sid, P, values, lit) in zip(targets, parts):
+                ids[k].reshape(-1)[part] = sid
+                points[k].reshape(-1, 3)[part] = P
+                raw[k].reshape(-1, 3)[part] = values
+                lits[k].reshape(ids[k].size, lit.shape[-1])[part] = lit
+            if on_level is not None:
+                on_level(step, [to_image(upsample(img, step)) for img in raw])
+    finally:
+        if ex is not None:
+            ex.shutdown(wait=False, cancel_futures=True)
+    buffers = [surface_buffers(scene, v, sid, P) for v, sid, P in zip(views, ids, points)]
+    if aa > 1:
+        if cancel is not None and cancel.is_set():
+            return None
+        raw = [antialias_view(scene, v, img, b, X, Y, pixel_step(scene, v, resolution), aa, deferred, zbuffer,
+                              lit=lit)
+               for v, img, b, (X, Y), lit in zip(views, raw, buffers, grids, lits)]
+    images = [to_image(img) for img in raw]
+    if keep_buffers:
+        return images, buffers
+    return images
+
+
+def render_views_cached(scene, views=(0, 1, 2), resolution=400, workers=1, cache=None, render=None,
+                        deferred=False, zbuffer=False, aa=1):
+    # (изображения, источники) с кешем common.cache.ArrayCache. Для каждого
+    # вида: 'cache' - готовое изображение, 'relight' - буферы видимости из
+    # кеша, пересчитано только освещение, 'render' - полный рендер.
+    # render(views) -> (изображения, буферы) для видов без кеша, по умолчанию
+    # render_views_progressive; если он вернул None (отмена) - (None, источники)
+    views = [view_index(v) for v in views]
+    if render is None:
+        render = lambda vs: render_views_progressive(scene, vs, resolution, workers=workers,
+                                                     keep_buffers=True, deferred=deferred, zbuffer=zbuffer, aa=aa)
+    if cache is None:
+        result = render(views)
+        return (None if result is None else result[0]), ["render"] * len(views)
+
+    geometry = [(s["C"], s["R"]) for s in scene.spheres]
+    keys = [cache.key("lab5", scene.to_dict(), v, resolution, deferred, aa) for v in views]
+    geo_keys = [cache.key("lab5-geometry", geometry, v, resolution) for v in views]
+    images, kinds, missing = [None] * len(views), [None] * len(views), []
+    for k, v in enumerate(views):
+        hit = cache.get(keys[k])
+        if hit is not None:
+            images[k], kinds[k] = hit["image"], "cache"
+            continue
+        buffers = cache.get(geo_keys[k])
+        if buffers is not None:
+            # маски теней зависят от источников и в кеш геометрии не входят
+            lit = light_visibility(scene, buffers["sphere_ids"], buffers["points"]) if aa > 1 else None
+            raw = relight(scene, v, buffers, deferred, lit)
+            if aa > 1:
+                X, Y = np.meshgrid(*view_grid(scene, v, resolution))
+                raw = antialias_view(scene, v, raw, buffers, X, Y, pixel_step(scene, v, resolution), aa,
+                                     deferred, zbuffer, lit=lit)
+            images[k], kinds[k] = to_image(raw), "relight"
+        else:
+            missing.append(k)
+
+    if missing:
+        result = render([views[k] for k in missing])
+        if result is None:
+            return None, kinds
+        for k, img, buffers in zip(missing, *result):
+            cache.put(geo_keys[k], buffers)
+            images[k], kinds[k] = img, "render"
+    for k in range(len(views)):
+        if kinds[k] != "cache":
+            cache.put(keys[k], {"image": images[k]})
+    return images, kinds
+
+
+def render_view(scene, view, resolution=400, workers=1, deferred=False, zbuffer=False, aa=1):
+    return render_views(scene, (view,), resolution, workers, deferred=deferred, zbuffer=zbuffer, aa=aa)[0]
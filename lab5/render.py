@@ -0,0 +1,63 @@
+# Рендер трех видов без GUI: python render.py scene.json [-r 400] [-o каталог] [-j процессы]
+# или кадра перспективной камеры: python render.py scene.json --camera X Y Z [--look-at X Y Z]
+import argparse
+import os
+import sys
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from raytrace import Scene, VIEWS, render_views, result_filename
+from camera import Camera, render_camera
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Рендер трех ортогональных видов сцены ЛР-5")
+    parser.add_argument("scene", help="JSON-файл сцены")
+    parser.add_argument("-r", "--resolution", type=int, default=400, help="высота изображения в пикселях")
+    parser.add_argument("-o", "--output", default=".", help="каталог для lab5_result_*.png")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="число процессов (1 - без пула)")
+    parser.add_argument("--tiles", type=int, default=None, help="число горизонтальных полос на вид")
+    parser.add_argument("--deferred", action="store_true", help="отложенное освещение через G-буфер")
+    parser.add_argument("--zbuffer", action="store_true", help="видимость растеризацией с z-буфером")
+    parser.add_argument("--aa", type=int, default=1,
+                        help="сглаживание границ: выборок на сторону пикселя (1 - без сглаживания)")
+    parser.add_argument("--camera", type=float, nargs=3, metavar=("X", "Y", "Z"),
+                        help="положение перспективной камеры (вместо трех видов)")
+    parser.add_argument("--look-at", type=float, nargs=3, default=(0, 0, 0), metavar=("X", "Y", "Z"),
+                        help="точка, куда смотрит камера")
+    parser.add_argument("--up", type=float, nargs=3, default=(0, 1, 0), metavar=("X", "Y", "Z"),
+                        help="направление \"вверх\" камеры")
+    parser.add_argument("--fov", type=float, default=60, help="вертикальный угол обзора камеры, градусы")
+    parser.add_argument("--size", type=int, nargs=2, default=(640, 480), metavar=("W", "H"),
+                        help="размер кадра камеры в пикселях")
+    args = parser.parse_args(argv)
+    if args.camera is not None and (args.aa > 1 or args.zbuffer or args.deferred):
+        # кадр камеры всегда считается лучами через G-буфер, без сглаживания
+        parser.error("--aa, --zbuffer и --deferred не применяются вместе с --camera")
+    camera = None
+    if args.camera is not None:
+        camera = Camera(args.camera, args.look_at, args.up, args.fov)
+        try:
+            camera.basis()
+        except ValueError as e:
+            parser.error(str(e))
+
+    scene = Scene.load(args.scene)
+    os.makedirs(args.output, exist_ok=True)
+    if camera is not None:
+        path = os.path.join(args.output, "lab5_camera.png")
+        Image.fromarray(render_camera(scene, camera, *args.size)).save(path)
+        print(f"Камера: {path}")
+        return
+    images = render_views(scene, resolution=args.resolution, workers=args.workers, tiles=args.tiles,
+                           deferred=args.deferred, zbuffer=args.zbuffer, aa=args.aa)
+    for idx, ((name, _, _, _), img) in enumerate(zip(VIEWS, images)):
+        path = os.path.join(args.output, result_filename(idx))
+        Image.fromarray(img).save(path)
+        print(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()